@@ -4,14 +4,15 @@ API endpoints for the Patient360 Chatbot.
 This module provides FastAPI endpoints for interacting with the chatbot.
 """
 
+import asyncio
 import logging
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-from app.database import get_db
+from app.database import get_db, AsyncSessionLocal
 from app.auth import get_current_user
 from app.models import User
 from app.chatbot.orchestrator import ChatOrchestrator, Message, ChatResponse
@@ -45,12 +46,62 @@ class ChatResponseModel(BaseModel):
     data_accessed: Optional[List[str]] = None
 
 
+class SuggestedPromptsResponse(BaseModel):
+    """Suggested prompts response model."""
+    prompts: List[str]
+
+
+# Suggested prompts by role, built once at import
+SUGGESTED_PROMPTS = {
+    "patient": {
+        "prompts": (
+            "What are my recent lab results?",
+            "What medications am I currently taking?",
+            "When is my next appointment?",
+            "What does my blood pressure reading mean?",
+            "Can you explain my diagnosis in simple terms?"
+        )
+    },
+    "doctor": {
+        "prompts": (
+            "Show me the latest labs for patient [name]",
+            "What medications is patient [name] taking?",
+            "What is the treatment protocol for hypertension?",
+            "Explain the side effects of metformin",
+            "What are the latest guidelines for diabetes management?"
+        )
+    },
+    "hospital": {
+        "prompts": (
+            "How many patients were seen this month?",
+            "What's the average length of stay?",
+            "What are the most common diagnoses in our hospital?",
+            "Show me the readmission rates for the past quarter",
+            "What's the current bed occupancy rate?"
+        )
+    }
+}
+
+DEFAULT_PROMPTS = {
+    "prompts": (
+        "How can I help you today?",
+        "What would you like to know?",
+        "What information are you looking for?",
+        "How can I assist you with your healthcare needs?",
+        "What questions do you have about your health?"
+    )
+}
+
+
+# NDJSON record separator for streamed chunks
+NL = b"\n"
+
 # Create chat orchestrator and streaming processor
 chat_orchestrator = ChatOrchestrator(rag_pipeline)
 streaming_processor = StreamingChatProcessor(chat_orchestrator)
 
 
-@router.post("/chat", response_model=ChatResponseModel)
+@router.post("/chat", response_model=ChatResponseModel, response_class=ORJSONResponse)
 async def chat(
     request: ChatRequest,
     current_user: User = Depends(get_current_user),
@@ -67,6 +118,10 @@ async def chat(
     Returns:
         The chatbot's response.
     """
+    # Classification only needs the message, so it runs while the data scope
+    # is loaded (and the orchestrator's speculative lookups)
+    classify_task = asyncio.create_task(chat_orchestrator._classify_query(request.message))
+    
     try:
         # Get data scope for the user
         data_scope = await get_data_scope(current_user, db)
@@ -74,26 +129,21 @@ async def chat(
         # Log the request
         logger.info(f"Chat request from user {current_user.id} ({current_user.role})")
         
-        # Process the request
+        # Process the request (repeated questions are answered from the
+        # orchestrator's response cache)
         response = await chat_orchestrator.process_chat_request(
             user=current_user,
             message=request.message,
             previous_messages=request.previous_messages,
             data_scope=data_scope,
-            db=db
+            db=db,
+            classify_task=classify_task
         )
         
-        # Get the context from the orchestrator
-        context = await chat_orchestrator._build_context(
-            user=current_user,
-            message=request.message,
-            previous_messages=request.previous_messages,
-            query_type=response.query_type,
-            data={},  # We don't need to rebuild the data
-            data_scope=data_scope
-        )
+        # Reuse the context the orchestrator already built
+        context = response.context
         
-        # Log the interaction
+        # Log the interaction (queued for the background audit writer)
         await log_chat_interaction(
             user_id=current_user.id,
             message=request.message,
@@ -101,10 +151,11 @@ async def chat(
             query_type=response.query_type,
             data_accessed=response.data_accessed,
             context=context,
-            db=db
+            db_factory=AsyncSessionLocal
         )
         
-        return response
+        # Returned directly so FastAPI skips re-validating against response_model
+        return ORJSONResponse(content=response.model_dump(exclude={"context"}))
     
     except Exception as e:
         logger.error(f"Error processing chat request: {e}")
@@ -112,6 +163,10 @@ async def chat(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error processing chat request"
         )
+    
+    finally:
+        if not classify_task.done():
+            classify_task.cancel()
 
 
 @router.post("/chat-stream")
@@ -147,7 +202,7 @@ async def chat_stream(
                 data_scope=data_scope,
                 db=db
             ):
-                yield chunk + "\n"
+                yield chunk + NL
         
         # Return streaming response
         return StreamingResponse(
@@ -162,7 +217,7 @@ async def chat_stream(
             detail="Error processing streaming chat request"
         )
 
-@router.get("/suggested-prompts")
+@router.get("/suggested-prompts", response_model=SuggestedPromptsResponse)
 async def get_suggested_prompts(
     current_user: User = Depends(get_current_user)
 ):
@@ -175,55 +230,5 @@ async def get_suggested_prompts(
     Returns:
         A list of suggested prompts.
     """
-    try:
-        # Get suggested prompts based on user role
-        if current_user.role == "patient":
-            return {
-                "prompts": [
-                    "What are my recent lab results?",
-                    "What medications am I currently taking?",
-                    "When is my next appointment?",
-                    "What does my blood pressure reading mean?",
-                    "Can you explain my diagnosis in simple terms?"
-                ]
-            }
-        
-        elif current_user.role == "doctor":
-            return {
-                "prompts": [
-                    "Show me the latest labs for patient [name]",
-                    "What medications is patient [name] taking?",
-                    "What is the treatment protocol for hypertension?",
-                    "Explain the side effects of metformin",
-                    "What are the latest guidelines for diabetes management?"
-                ]
-            }
-        
-        elif current_user.role == "hospital":
-            return {
-                "prompts": [
-                    "How many patients were seen this month?",
-                    "What's the average length of stay?",
-                    "What are the most common diagnoses in our hospital?",
-                    "Show me the readmission rates for the past quarter",
-                    "What's the current bed occupancy rate?"
-                ]
-            }
-        
-        else:
-            return {
-                "prompts": [
-                    "How can I help you today?",
-                    "What would you like to know?",
-                    "What information are you looking for?",
-                    "How can I assist you with your healthcare needs?",
-                    "What questions do you have about your health?"
-                ]
-            }
-    
-    except Exception as e:
-        logger.error(f"Error getting suggested prompts: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error getting suggested prompts"
-        )
\ No newline at end of file
+    # Get suggested prompts based on user role
+    return SUGGESTED_PROMPTS.get(current_user.role, DEFAULT_PROMPTS)
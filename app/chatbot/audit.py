@@ -7,24 +7,143 @@ HIPAA-SAFE VERSION:
 - Only structured metadata is persisted
 """
 
+import os
+import asyncio
 import logging
-import json
+import orjson
 import hashlib
-from datetime import datetime
-from typing import List, Optional, Dict, Any
-from sqlalchemy import insert
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Dict, Any
+from sqlalchemy import insert, select, and_, func, literal_column
+from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import ChatAuditLog
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+UTC = timezone.utc
+
+
+# Audit rows are buffered and written in batches by background writer tasks
+AUDIT_QUEUE_MAXSIZE = int(os.getenv("AUDIT_QUEUE_MAXSIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "256"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "50")) / 1000  # seconds
+AUDIT_WRITER_COUNT = int(os.getenv("AUDIT_WRITER_COUNT", "2"))
+
+_audit_queue: Optional[asyncio.Queue] = None
+_audit_writer_tasks: List[asyncio.Task] = []
+
+
+def _utcnow() -> datetime:
+    """Current UTC time as a naive datetime, matching the timestamp column."""
+    return datetime.now(UTC).replace(tzinfo=None)
+
 
 def _sha256(text: str) -> str:
     """Generate SHA-256 hash for audit-safe storage."""
-    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return hashlib.sha256(text.encode("utf-8"), usedforsecurity=False).hexdigest()
+
+
+def start_audit_writer(db_factory: Callable[[], AsyncSession]) -> None:
+    """
+    Start the background audit writers.
+
+    Once running, audit logging only enqueues rows; each of the
+    AUDIT_WRITER_COUNT writers drains up to AUDIT_BATCH_SIZE rows (or
+    whatever arrives within AUDIT_FLUSH_INTERVAL) and persists them with
+    one multi-row INSERT, so a slow insert doesn't stall the queue.
+    """
+    global _audit_queue, _audit_writer_tasks
+
+    if any(not task.done() for task in _audit_writer_tasks):
+        return
+
+    _audit_queue = asyncio.Queue(maxsize=AUDIT_QUEUE_MAXSIZE)
+    _audit_writer_tasks = [
+        asyncio.create_task(_audit_writer(_audit_queue, db_factory))
+        for _ in range(max(AUDIT_WRITER_COUNT, 1))
+    ]
+    logger.info(f"[AUDIT] {len(_audit_writer_tasks)} background audit writers started")
+
+
+async def stop_audit_writer(timeout: float = 5.0) -> None:
+    """
+    Flush pending audit rows and stop the background writers.
+    """
+    global _audit_queue, _audit_writer_tasks
+
+    if not _audit_writer_tasks:
+        return
+
+    try:
+        await asyncio.wait_for(_audit_queue.join(), timeout)
+    except asyncio.TimeoutError:
+        logger.error(f"[AUDIT ERROR] {_audit_queue.qsize()} audit rows not flushed on shutdown")
+
+    for task in _audit_writer_tasks:
+        task.cancel()
+    await asyncio.gather(*_audit_writer_tasks, return_exceptions=True)
+
+    _audit_queue = None
+    _audit_writer_tasks = []
+    logger.info("[AUDIT] Background audit writers stopped")
+
+
+async def _audit_writer(queue: asyncio.Queue, db_factory: Callable[[], AsyncSession]) -> None:
+    """
+    Consumer that batches queued audit rows into multi-row inserts.
+    """
+    loop = asyncio.get_running_loop()
+
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + AUDIT_FLUSH_INTERVAL
+
+        while len(batch) < AUDIT_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            async with db_factory() as session:
+                await session.execute(insert(ChatAuditLog), batch)
+                await session.commit()
+        except Exception as e:
+            logger.error(f"[AUDIT ERROR] Failed to write {len(batch)} audit rows: {e}")
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+
+async def _persist_audit_row(
+    audit_log: Dict[str, Any],
+    db: AsyncSession = None,
+    db_factory: Optional[Callable[[], AsyncSession]] = None
+) -> None:
+    """
+    Hand an audit row to the background writer, or write it directly
+    when the writer isn't running (or its queue is full).
+    """
+    if _audit_queue is not None:
+        try:
+            _audit_queue.put_nowait(audit_log)
+            return
+        except asyncio.QueueFull:
+            logger.warning("[AUDIT] Audit queue full, writing row inline")
+
+    if db_factory is not None:
+        async with db_factory() as session:
+            await session.execute(insert(ChatAuditLog).values(**audit_log))
+            await session.commit()
+    elif db is not None:
+        await db.execute(insert(ChatAuditLog).values(**audit_log))
+        await db.commit()
 
 
 async def log_chat_interaction(
@@ -34,22 +153,27 @@ async def log_chat_interaction(
     query_type: str,
     data_accessed: Optional[List[str]] = None,
     context: Optional[List[Dict[str, str]]] = None,
-    db: AsyncSession = None
+    db: AsyncSession = None,
+    db_factory: Optional[Callable[[], AsyncSession]] = None
 ) -> None:
     """
     Log a chat interaction to the audit log (HIPAA compliant).
 
+    The row is queued for the background writer when it is running.
+    Otherwise it is written directly; pass `db_factory` instead of `db`
+    when running outside the request so the insert gets its own session.
+
     ⚠️ NO RAW MESSAGE OR RESPONSE STORED
     """
     try:
         logger.info(f"[AUDIT] user_id={user_id}, query_type={query_type}")
 
-        if db is None:
+        if _audit_queue is None and db is None and db_factory is None:
             return
 
         audit_log = {
             "user_id": user_id,
-            "timestamp": datetime.utcnow(),
+            "timestamp": _utcnow(),
 
             # Store the actual message and response
             "message": message,
@@ -57,17 +181,16 @@ async def log_chat_interaction(
 
             # ✅ Metadata only
             "query_type": query_type,
-            "data_accessed": json.dumps(data_accessed) if data_accessed else None,
+            "data_accessed": data_accessed or None,
 
             # ⚠️ Store role-only context (NO content)
-            "context": json.dumps([
+            "context": orjson.dumps([
                 {"role": msg.get("role")}
                 for msg in context
-            ]) if context else None
+            ]).decode() if context else None
         }
 
-        await db.execute(insert(ChatAuditLog).values(**audit_log))
-        await db.commit()
+        await _persist_audit_row(audit_log, db=db, db_factory=db_factory)
 
     except Exception as e:
         logger.error(f"[AUDIT ERROR] {e}")
@@ -88,23 +211,25 @@ async def log_chat_interaction_simple(
     try:
         logger.info(f"[AUDIT] user_id={user_id}, query_type={query_type}")
 
-        if db is None:
+        if _audit_queue is None and db is None:
             return
 
         audit_log = {
             "user_id": user_id,
-            "timestamp": datetime.utcnow(),
+            "timestamp": _utcnow(),
 
             # Store the actual message and response
             "message": message,
             "response": response,
 
             "query_type": query_type,
-            "data_accessed": json.dumps(data_accessed) if data_accessed else None
+            "data_accessed": data_accessed or None,
+
+            # Batched inserts need the same columns on every row
+            "context": None
         }
 
-        await db.execute(insert(ChatAuditLog).values(**audit_log))
-        await db.commit()
+        await _persist_audit_row(audit_log, db=db)
 
     except Exception as e:
         logger.error(f"[AUDIT ERROR] {e}")
@@ -121,23 +246,26 @@ async def get_user_chat_history(
     if db is None:
         return []
 
-    result = await db.execute(
-        """
-        SELECT id, timestamp, query_type, data_accessed
-        FROM chat_audit_log
-        WHERE user_id = :user_id
-        ORDER BY timestamp DESC
-        LIMIT :limit
-        """,
-        {"user_id": user_id, "limit": limit}
+    stmt = (
+        select(
+            ChatAuditLog.id,
+            ChatAuditLog.timestamp,
+            ChatAuditLog.query_type,
+            ChatAuditLog.data_accessed
+        )
+        .where(ChatAuditLog.user_id == user_id)
+        .order_by(ChatAuditLog.timestamp.desc())
+        .limit(limit)
     )
 
+    result = await db.execute(stmt)
+
     return [
         {
             "id": row.id,
             "timestamp": row.timestamp.isoformat(),
             "query_type": row.query_type,
-            "data_accessed": json.loads(row.data_accessed) if row.data_accessed else None
+            "data_accessed": row.data_accessed
         }
         for row in result
     ]
@@ -155,36 +283,35 @@ async def get_data_access_report(
     if db is None:
         return []
 
-    query = """
-        SELECT id, user_id, timestamp, query_type, data_accessed
-        FROM chat_audit_log
-        WHERE 1=1
-    """
-    params = {}
+    conditions = []
 
     if user_id:
-        query += " AND user_id = :user_id"
-        params["user_id"] = user_id
+        conditions.append(ChatAuditLog.user_id == user_id)
 
     if start_date:
-        query += " AND timestamp >= :start_date"
-        params["start_date"] = start_date
+        conditions.append(ChatAuditLog.timestamp >= start_date)
 
     if end_date:
-        query += " AND timestamp <= :end_date"
-        params["end_date"] = end_date
+        conditions.append(ChatAuditLog.timestamp <= end_date)
+
+    # Shape the report in Postgres: one JSON array instead of N driver rows
+    report_row = func.jsonb_build_object(
+        "id", ChatAuditLog.id,
+        "user_id", ChatAuditLog.user_id,
+        "timestamp", ChatAuditLog.timestamp,
+        "query_type", ChatAuditLog.query_type,
+        "data_accessed", ChatAuditLog.data_accessed
+    )
+    report = func.coalesce(
+        func.jsonb_agg(aggregate_order_by(report_row, ChatAuditLog.timestamp.desc())),
+        literal_column("'[]'::jsonb"),
+        type_=JSONB
+    )
 
-    query += " ORDER BY timestamp DESC"
+    stmt = select(report)
+    if conditions:
+        stmt = stmt.where(and_(*conditions))
 
-    result = await db.execute(query, params)
+    result = await db.execute(stmt)
 
-    return [
-        {
-            "id": row.id,
-            "user_id": row.user_id,
-            "timestamp": row.timestamp.isoformat(),
-            "query_type": row.query_type,
-            "data_accessed": json.loads(row.data_accessed) if row.data_accessed else None
-        }
-        for row in result
-    ]
+    return result.scalar_one()
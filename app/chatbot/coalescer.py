@@ -0,0 +1,180 @@
+"""
+Request coalescing for the Patient360 Chatbot.
+
+Concurrent questions that share the exact same LLM context (system prompt,
+data and history) are answered with one chat completion: the questions are
+numbered [Q1]..[Qn] and the reply is split on the matching [A1]..[An]
+markers, so the shared prefix is only sent (and billed) once.
+"""
+
+import os
+import re
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, List, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Coalescing is off unless a window is configured
+COALESCE_WINDOW_MS = float(os.getenv("LLM_COALESCE_WINDOW_MS", "0"))
+COALESCE_MAX_BATCH = int(os.getenv("LLM_COALESCE_MAX_BATCH", "8"))
+
+ANSWER_MARKER_RE = re.compile(r"\[A(\d+)\]")
+
+BATCH_INSTRUCTIONS = (
+    "Several questions follow, each marked [Q1], [Q2], and so on. "
+    "Answer each one separately and start each answer with the matching marker "
+    "[A1], [A2], and so on. Do not refer to the other questions in an answer."
+)
+
+# Sends a context with a max_tokens budget and returns the reply text
+SendFn = Callable[[List[Dict[str, str]], int], Awaitable[str]]
+
+
+class BatchCoalescer:
+    """
+    Merges identical-context questions that arrive within a short window.
+    """
+    
+    def __init__(
+        self,
+        window_ms: float = COALESCE_WINDOW_MS,
+        max_batch: int = COALESCE_MAX_BATCH
+    ):
+        """
+        Initialize the coalescer.
+        
+        Args:
+            window_ms: How long the first question of a batch waits for others.
+            max_batch: Flush as soon as this many questions are waiting.
+        """
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        
+        # key -> (send function, shared context and token budget of the first caller,
+        #         [(question, future)])
+        self._pending: Dict[
+            Hashable,
+            Tuple[SendFn, List[Dict[str, str]], int, List[Tuple[str, asyncio.Future]]]
+        ] = {}
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether questions are coalesced at all."""
+        return self.window > 0 and self.max_batch > 1
+    
+    @staticmethod
+    def make_key(model: str, context: List[Dict[str, str]]) -> Hashable:
+        """
+        Key under which contexts may share a completion.
+        
+        Everything but the final user question is part of the key, so only
+        requests with the same prompt, data scope and data are ever merged.
+        """
+        return model, tuple((msg["role"], msg["content"]) for msg in context[:-1])
+    
+    async def submit(
+        self,
+        key: Hashable,
+        context: List[Dict[str, str]],
+        send: SendFn,
+        max_tokens: int = 500
+    ) -> str:
+        """
+        Queue a question and wait for its answer.
+        
+        Args:
+            key: The coalescing key from make_key.
+            context: The full context; its last message is the user's question.
+            send: Sends a context to the LLM; every caller with this key must
+                send the same way (model, temperature, ...).
+            max_tokens: Token budget per answer.
+        
+        Returns:
+            The answer to this caller's question.
+        """
+        future = asyncio.get_running_loop().create_future()
+        
+        if key not in self._pending:
+            self._pending[key] = (send, context[:-1], max_tokens, [])
+            asyncio.create_task(self._flush_after_window(key, self._pending[key]))
+        
+        _, _, _, questions = self._pending[key]
+        questions.append((context[-1]["content"], future))
+        
+        if len(questions) >= self.max_batch:
+            self._start_flush(key)
+        
+        return await future
+    
+    async def _flush_after_window(self, key: Hashable, batch: Tuple) -> None:
+        """Flush a batch once its window has passed, unless it was already sent."""
+        await asyncio.sleep(self.window)
+        if self._pending.get(key) is batch:
+            self._start_flush(key)
+    
+    def _start_flush(self, key: Hashable) -> None:
+        """Take a batch out of the pending map and send it in the background."""
+        send, prefix, max_tokens, questions = self._pending.pop(key)
+        asyncio.create_task(self._flush(prefix, send, max_tokens, questions))
+    
+    async def _flush(
+        self,
+        prefix: List[Dict[str, str]],
+        send: SendFn,
+        max_tokens: int,
+        questions: List[Tuple[str, asyncio.Future]]
+    ) -> None:
+        """Answer a batch and resolve every waiting caller."""
+        try:
+            if len(questions) == 1:
+                question, _ = questions[0]
+                answers = [await send(prefix + [{"role": "user", "content": question}], max_tokens)]
+            else:
+                answers = await self._answer_batch(
+                    prefix, send, max_tokens, [question for question, _ in questions]
+                )
+        except Exception as e:
+            for _, future in questions:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), answer in zip(questions, answers):
+            if not future.done():
+                future.set_result(answer)
+    
+    async def _answer_batch(
+        self,
+        prefix: List[Dict[str, str]],
+        send: SendFn,
+        max_tokens: int,
+        questions: List[str]
+    ) -> List[str]:
+        """
+        Answer several questions with one completion.
+        
+        Questions whose answer is missing from the reply are re-sent alone.
+        """
+        numbered = "\n".join(f"[Q{i}] {question}" for i, question in enumerate(questions, 1))
+        reply = await send(
+            prefix + [{"role": "user", "content": f"{BATCH_INSTRUCTIONS}\n\n{numbered}"}],
+            max_tokens * len(questions)
+        )
+        logger.info(f"Answered {len(questions)} coalesced questions with one completion")
+        
+        # re.split with a group gives [preamble, number, answer, number, answer, ...]
+        parts = ANSWER_MARKER_RE.split(reply)
+        answers: Dict[int, str] = {}
+        for number, text in zip(parts[1::2], parts[2::2]):
+            answers.setdefault(int(number), text.strip())
+        
+        results = []
+        for i, question in enumerate(questions, 1):
+            answer = answers.get(i)
+            if not answer:
+                logger.warning(f"Coalesced reply is missing answer {i}, asking separately")
+                answer = await send(prefix + [{"role": "user", "content": question}], max_tokens)
+            results.append(answer)
+        return results
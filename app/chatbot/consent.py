@@ -1,12 +1,47 @@
 # app/chatbot/consent.py
 
+import time
+from typing import Dict
+
+from sqlalchemy import select, exists, and_
+
 from app.models import PatientConsent
 
+# Positive HIPAA consents rarely change within a conversation, so they are
+# cached briefly; missing consent is always re-checked against the database.
+CONSENT_CACHE_TTL_SECONDS = 60
+CONSENT_CACHE_MAX_SIZE = 4096
+
+_consent_cache: Dict[int, float] = {}
+
+
+def invalidate_consent_cache(patient_id: int) -> None:
+    """Drop a cached consent after the patient's consent records change."""
+    _consent_cache.pop(patient_id, None)
+
+
 async def has_patient_consent(patient_id: int, db) -> bool:
+    cached_at = _consent_cache.get(patient_id)
+    if cached_at is not None:
+        if time.monotonic() - cached_at <= CONSENT_CACHE_TTL_SECONDS:
+            return True
+        del _consent_cache[patient_id]
+
     result = await db.execute(
-        PatientConsent.__table__.select().where(
-            PatientConsent.patient_id == patient_id,
-            PatientConsent.hipaa == True
+        select(
+            exists().where(
+                and_(
+                    PatientConsent.patient_id == patient_id,
+                    PatientConsent.hipaa.is_(True)
+                )
+            )
         )
     )
-    return result.first() is not None
+    has_consent = bool(result.scalar())
+
+    if has_consent:
+        if len(_consent_cache) >= CONSENT_CACHE_MAX_SIZE:
+            _consent_cache.pop(next(iter(_consent_cache)))
+        _consent_cache[patient_id] = time.monotonic()
+
+    return has_consent
@@ -0,0 +1,85 @@
+"""
+Shared HTTP client for the Patient360 Chatbot's OpenAI calls.
+
+All chatbot OpenAI clients reuse one pooled HTTP/2 connection pool, so LLM
+calls start on an already-open TLS connection and concurrent requests are
+multiplexed instead of each opening its own HTTP/1.1 pool.
+"""
+
+import os
+import asyncio
+import logging
+from functools import lru_cache
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Cap on in-flight LLM calls per process, to stay under the account's rate limits
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+
+# Retries (with exponential backoff) on 429s, 5xx and connection errors
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+
+http_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(
+        max_connections=200,
+        max_keepalive_connections=64,
+        keepalive_expiry=60
+    ),
+    timeout=httpx.Timeout(15.0, connect=2.0)
+)
+
+# Pool for synchronous callers (ChromaDB calls its embedding function synchronously)
+sync_http_client = httpx.Client(
+    http2=True,
+    limits=httpx.Limits(
+        max_connections=32,
+        max_keepalive_connections=8,
+        keepalive_expiry=60
+    ),
+    timeout=httpx.Timeout(15.0, connect=2.0)
+)
+
+# Held around every chat completion and embedding call
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+
+@lru_cache(maxsize=1)
+def get_openai_client() -> AsyncOpenAI:
+    """
+    Create the shared OpenAI client on first use.
+    
+    Returns:
+        An AsyncOpenAI client on the shared connection pool.
+    """
+    return AsyncOpenAI(
+        api_key=os.getenv("LLM_API_KEY"),
+        http_client=http_client,
+        max_retries=LLM_MAX_RETRIES
+    )
+
+
+@lru_cache(maxsize=1)
+def get_sync_openai_client() -> OpenAI:
+    """
+    Create the shared synchronous OpenAI client on first use.
+    
+    Returns:
+        An OpenAI client on the shared synchronous connection pool.
+    """
+    return OpenAI(
+        api_key=os.getenv("LLM_API_KEY"),
+        http_client=sync_http_client,
+        max_retries=LLM_MAX_RETRIES
+    )
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP clients (called on application shutdown)."""
+    await http_client.aclose()
+    sync_http_client.close()
+    logger.info("Closed shared OpenAI HTTP clients")
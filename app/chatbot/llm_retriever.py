@@ -1,27 +1,192 @@
 # app/chatbot/llm_retriever.py
 
 import os
+import re
+import sys
 import json
+import time
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
-from openai import AsyncOpenAI
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+
+from app.chatbot.llm_client import get_openai_client, llm_semaphore
+from app.chatbot.query_router import get_query_router
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Local intent classifier (optional)
+try:
+    import fasttext
+    FASTTEXT_SUPPORT = True
+except ImportError:
+    FASTTEXT_SUPPORT = False
+
+# Path to a FastText model trained on (query, categories) pairs with loss="ova"
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH")
+INTENT_MODEL_THRESHOLD = float(os.getenv("INTENT_MODEL_THRESHOLD", "0.4"))
+
+# Placeholder returned when no data category is needed or the LLM call fails
+SUMMARY_ONLY = "Clinical summary available."
+
+# Punctuation is dropped when normalizing cache keys
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+# Same replacement for ASCII text as a translate table, built from the regex
+_ASCII_PUNCTUATION_TABLE = {
+    code: " " for code in range(128) if _PUNCTUATION_RE.match(chr(code))
+}
+
+
+def is_summary_only(filtered_data: Dict[str, Any]) -> bool:
+    """Check whether filtered data is just the summary placeholder."""
+    return len(filtered_data) == 1 and filtered_data.get("summary") == SUMMARY_ONLY
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query for exact-match cache lookups.
+    Lowercases, strips punctuation and collapses whitespace.
+    """
+    query = query.lower()
+    if query.isascii():
+        query = query.translate(_ASCII_PUNCTUATION_TABLE)
+    else:
+        query = _PUNCTUATION_RE.sub(" ", query)
+    # Interned so repeated questions hit the caches with identical key objects
+    return sys.intern(" ".join(query.split()))
+
+
+# Intent classification prompt, split around the per-call query and category list
+_INTENT_SYSTEM_MESSAGE = {"role": "system", "content": "You are a healthcare query analyzer."}
+_INTENT_PROMPT_HEAD = """
+        Analyze the following healthcare query and determine which data categories are needed to answer it.
+        
+        Query: \""""
+_INTENT_PROMPT_MID = """"
+        
+        Available data categories:
+        """
+_INTENT_PROMPT_TAIL = """
+        
+        Return ONLY a JSON array of the required categories, nothing else. For example: ["medications", "labs"]
+        """
+
+
+@lru_cache(maxsize=64)
+def _categories_text(categories: Tuple[str, ...]) -> str:
+    """
+    Join the available data categories for the intent prompt.
+    Cached because the same category sets recur across requests.
+    """
+    return ", ".join(categories)
+
+
+def build_intent_messages(message: str, categories: Tuple[str, ...]) -> List[Dict[str, str]]:
+    """
+    Build the chat messages for LLM intent classification.
+    
+    Args:
+        message: The user's message.
+        categories: The available data categories.
+        
+    Returns:
+        The system and user messages for the completion call.
+    """
+    prompt = "".join((_INTENT_PROMPT_HEAD, message, _INTENT_PROMPT_MID, _categories_text(categories), _INTENT_PROMPT_TAIL))
+    return [_INTENT_SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
+
+
+class LocalIntentClassifier:
+    """
+    Local multi-label FastText classifier for data categories.
+    Avoids the remote LLM call when it predicts confidently.
+    """
+    
+    LABEL_PREFIX = "__label__"
+    
+    def __init__(self, model_path: str, threshold: float = 0.4):
+        """
+        Load the classifier.
+        
+        Args:
+            model_path: Path to the trained FastText model.
+            threshold: Minimum probability for a category to be returned.
+        """
+        self.model = fasttext.load_model(model_path)
+        self.threshold = threshold
+    
+    def predict(self, message: str) -> List[str]:
+        """
+        Predict the data categories needed for a query.
+        
+        Args:
+            message: The user's message.
+            
+        Returns:
+            Categories above the threshold, empty when the model isn't confident.
+        """
+        # FastText rejects newlines in its input
+        labels, _ = self.model.predict(message.replace("\n", " "), k=-1, threshold=self.threshold)
+        return [label[len(self.LABEL_PREFIX):] for label in labels]
+
+
+@lru_cache(maxsize=1)
+def get_local_intent_classifier() -> Optional[LocalIntentClassifier]:
+    """
+    Load the local intent classifier once per process.
+    
+    Returns:
+        The classifier, or None if FastText or the model isn't available.
+    """
+    if not INTENT_MODEL_PATH:
+        return None
+    
+    if not FASTTEXT_SUPPORT:
+        logger.warning("INTENT_MODEL_PATH is set but fasttext is not installed. Local intent classification disabled.")
+        return None
+    
+    try:
+        classifier = LocalIntentClassifier(INTENT_MODEL_PATH, threshold=INTENT_MODEL_THRESHOLD)
+        logger.info(f"Loaded local intent classifier from {INTENT_MODEL_PATH}")
+        return classifier
+    except Exception as e:
+        logger.error(f"Failed to load local intent classifier: {e}")
+        return None
+
+
 class LLMDataRetriever:
     """
     LLM-based data retrieval for understanding user queries.
     Uses a smaller LLM to determine which data categories are needed.
     """
     
-    def __init__(self):
-        # Initialize OpenAI client
-        self.client = AsyncOpenAI(api_key=os.getenv("LLM_API_KEY"))
+    def __init__(
+        self,
+        cache_size_limit: int = 100,
+        ttl_seconds: float = 3600,
+        similarity_threshold: float = 0.95
+    ):
+        # Shared OpenAI client on the shared connection pool
+        self.client = get_openai_client()
+        
+        # Exact-match LRU cache: normalized query -> (inserted_at, categories)
+        self._order: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+        self.cache_size_limit = cache_size_limit
+        self.ttl_seconds = ttl_seconds
         
-        # Cache for performance optimization
-        self.cache = {}
-        self.cache_size_limit = 100
+        # Semantic cache: one L2-normalized MiniLM embedding row per cached key,
+        # packed into the first len(self._emb_keys) rows of a preallocated matrix
+        self.similarity_threshold = similarity_threshold
+        self._emb_keys: List[str] = []
+        self._emb_rows: Dict[str, int] = {}
+        self._emb_matrix: Optional[np.ndarray] = None
+        
+        # Local classifier answers confident queries without calling the LLM
+        self.local_classifier = get_local_intent_classifier()
     
     async def extract_data_needs(self, message: str, available_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -34,41 +199,52 @@ class LLMDataRetriever:
         Returns:
             Filtered data based on the query intent.
         """
-        # Check cache first
-        cache_key = message.lower().strip()
-        if cache_key in self.cache:
+        # Check exact-match cache first
+        cache_key = normalize_query(message)
+        cached_categories = self._get_cached(cache_key)
+        if cached_categories is not None:
             logger.info(f"Using cached result for query: {message}")
-            cached_categories = self.cache[cache_key]
             return self._filter_data(cached_categories, available_data)
         
-        # Dynamically determine available data categories from the data
-        data_categories = list(available_data.keys())
-        logger.info(f"Available data categories: {data_categories}")
-        
-        # Use LLM to understand the query
-        prompt = f"""
-        Analyze the following healthcare query and determine which data categories are needed to answer it.
+        # Try the local classifier; fall back to the LLM on low confidence
+        if self.local_classifier is not None:
+            try:
+                local_categories = self.local_classifier.predict(message)
+                if local_categories:
+                    logger.info(f"Local classifier categories: {local_categories}")
+                    self._update_cache(cache_key, local_categories)
+                    return self._filter_data(local_categories, available_data)
+            except Exception as e:
+                logger.error(f"Error in local intent classification: {str(e)}")
         
-        Query: "{message}"
+        # Then look for a semantically equivalent cached query
+        query_vector = None
+        if self._emb_keys:
+            query_vector = await self._embed(message)
+        if query_vector is not None:
+            cached_categories = self._semantic_lookup(query_vector)
+            if cached_categories is not None:
+                logger.info(f"Using semantically cached result for query: {message}")
+                self._update_cache(cache_key, cached_categories, query_vector)
+                return self._filter_data(cached_categories, available_data)
         
-        Available data categories:
-        {', '.join(data_categories)}
+        # Dynamically determine available data categories from the data
+        data_categories = tuple(available_data)
+        logger.info(f"Available data categories: {list(data_categories)}")
         
-        Return ONLY a JSON array of the required categories, nothing else. For example: ["medications", "labs"]
-        """
+        # Use LLM to understand the query
+        messages = build_intent_messages(message, data_categories)
         
         try:
             logger.info(f"Sending query to LLM for intent classification: {message}")
             
-            response = await self.client.chat.completions.create(
-                model="gpt-3.5-turbo",  # Use a smaller, faster model
-                messages=[
-                    {"role": "system", "content": "You are a healthcare query analyzer."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0,
-                max_tokens=100
-            )
+            async with llm_semaphore:
+                response = await self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",  # Use a smaller, faster model
+                    messages=messages,
+                    temperature=0,
+                    max_tokens=100
+                )
             
             # Parse the response
             response_text = response.choices[0].message.content.strip()
@@ -84,18 +260,20 @@ class LLMDataRetriever:
                     required_categories = []
                 
                 # Update cache
-                self._update_cache(cache_key, required_categories)
+                if query_vector is None:
+                    query_vector = await self._embed(message)
+                self._update_cache(cache_key, required_categories, query_vector)
                 
                 return self._filter_data(required_categories, available_data)
                 
             except json.JSONDecodeError as e:
                 logger.error(f"Failed to parse LLM response as JSON: {e}")
-                return {"summary": "Clinical summary available."}
+                return {"summary": SUMMARY_ONLY}
             
         except Exception as e:
             logger.error(f"Error in LLM data retrieval: {str(e)}")
             # Fallback to a simple summary if LLM fails
-            return {"summary": "Clinical summary available."}
+            return {"summary": SUMMARY_ONLY}
     
     def _filter_data(self, categories: List[str], available_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -118,24 +296,137 @@ class LLMDataRetriever:
         # If no categories matched, return a summary
         if not filtered_data:
             logger.info("No matching categories found, returning summary")
-            filtered_data["summary"] = "Clinical summary available."
+            filtered_data["summary"] = SUMMARY_ONLY
         
         return filtered_data
     
-    def _update_cache(self, key: str, value: Any) -> None:
+    async def _embed(self, text: str) -> Optional[np.ndarray]:
+        """
+        Embed a query for the semantic cache with the local query router's
+        MiniLM model, which already embeds (and caches) each chat message.
+        
+        Args:
+            text: The text to embed.
+            
+        Returns:
+            The L2-normalized float32 embedding, or None if the router isn't
+            available or embedding failed.
+        """
+        router = get_query_router()
+        if router is None:
+            return None
+        try:
+            return await asyncio.to_thread(router.embed, text)
+        except Exception as e:
+            logger.warning(f"Embedding failed, skipping semantic cache: {str(e)}")
+            return None
+    
+    def _is_expired(self, inserted_at: float) -> bool:
+        return time.monotonic() - inserted_at > self.ttl_seconds
+    
+    def _get_cached(self, key: str) -> Optional[List[str]]:
+        """
+        Look up a normalized query in the exact-match cache.
+        Expired entries are dropped lazily.
+        
+        Args:
+            key: Normalized query.
+            
+        Returns:
+            The cached categories, or None on a miss.
+        """
+        entry = self._order.get(key)
+        if entry is None:
+            return None
+        
+        inserted_at, categories = entry
+        if self._is_expired(inserted_at):
+            self._evict(key)
+            return None
+        
+        self._order.move_to_end(key)
+        return categories
+    
+    def _semantic_lookup(self, query_vector: np.ndarray) -> Optional[List[str]]:
+        """
+        Find the most similar cached query by cosine similarity.
+        
+        Args:
+            query_vector: L2-normalized query embedding.
+            
+        Returns:
+            The cached categories of the best match above the threshold, or None.
+        """
+        if not self._emb_keys:
+            return None
+        
+        # One matrix-vector product (BLAS sgemv) over all cached rows
+        sims = self._emb_matrix[:len(self._emb_keys)] @ query_vector
+        best = int(np.argmax(sims))
+        if sims[best] <= self.similarity_threshold:
+            return None
+        
+        return self._get_cached(self._emb_keys[best])
+    
+    def _evict(self, key: str) -> None:
+        """
+        Remove a key from both cache tiers.
+        
+        Args:
+            key: Normalized query.
+        """
+        self._order.pop(key, None)
+        row = self._emb_rows.pop(key, None)
+        if row is None:
+            return
+        
+        # Move the last row into the freed slot to keep rows packed
+        last = len(self._emb_keys) - 1
+        if row != last:
+            moved_key = self._emb_keys[last]
+            self._emb_matrix[row] = self._emb_matrix[last]
+            self._emb_keys[row] = moved_key
+            self._emb_rows[moved_key] = row
+        self._emb_keys.pop()
+    
+    def _append_embedding(self, key: str, vector: np.ndarray) -> None:
+        """
+        Add an embedding row, growing the matrix in chunks to amortize reallocation.
+        
+        Args:
+            key: Normalized query.
+            vector: L2-normalized query embedding.
+        """
+        count = len(self._emb_keys)
+        if self._emb_matrix is None:
+            capacity = min(self.cache_size_limit + 1, 1024)
+            self._emb_matrix = np.empty((capacity, vector.shape[0]), dtype=np.float32)
+        elif count == self._emb_matrix.shape[0]:
+            grown = np.empty((count + 1024, self._emb_matrix.shape[1]), dtype=np.float32)
+            grown[:count] = self._emb_matrix
+            self._emb_matrix = grown
+        
+        self._emb_matrix[count] = vector
+        self._emb_keys.append(key)
+        self._emb_rows[key] = count
+    
+    def _update_cache(self, key: str, value: List[str], vector: Optional[np.ndarray] = None) -> None:
         """
         Update the cache with a new key-value pair.
         
         Args:
-            key: Cache key.
-            value: Value to cache.
-        """
-        # Add to cache
-        self.cache[key] = value
-        
-        # Trim cache if it exceeds the size limit
-        if len(self.cache) > self.cache_size_limit:
-            # Remove oldest entries (assuming Python 3.7+ where dict insertion order is preserved)
-            oldest_keys = list(self.cache.keys())[:-self.cache_size_limit]
-            for old_key in oldest_keys:
-                del self.cache[old_key]
\ No newline at end of file
+            key: Normalized query.
+            value: Categories to cache.
+            vector: L2-normalized query embedding for the semantic tier.
+        """
+        # Add to cache as most recently used
+        self._order[key] = (time.monotonic(), value)
+        self._order.move_to_end(key)
+        
+        if vector is not None and key not in self._emb_rows:
+            self._append_embedding(key, vector)
+        
+        # Evict least recently used entries beyond the size limit
+        while len(self._order) > self.cache_size_limit:
+            oldest_key, _ = self._order.popitem(last=False)
+            self._evict(oldest_key)
@@ -1,13 +1,92 @@
 # app/chatbot/minimum_necessary.py
 
+import asyncio
 import logging
-from typing import Dict, Any, List, Set
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Set
 import re
-from app.chatbot.llm_retriever import LLMDataRetriever
+import numpy as np
+from app.chatbot.llm_retriever import LLMDataRetriever, SUMMARY_ONLY, is_summary_only
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Aho-Corasick keyword matching (optional, falls back to a compiled regex)
+try:
+    import ahocorasick
+    AHOCORASICK_SUPPORT = True
+except ImportError:
+    AHOCORASICK_SUPPORT = False
+
+# C implementation of edit distance (optional, falls back to pure Python)
+try:
+    from rapidfuzz import fuzz, process
+    from rapidfuzz.distance import Levenshtein
+    RAPIDFUZZ_SUPPORT = True
+except ImportError:
+    RAPIDFUZZ_SUPPORT = False
+
+# JIT-compiled edit distance for when rapidfuzz isn't installed (optional)
+try:
+    from numba import njit
+    NUMBA_SUPPORT = True
+except ImportError:
+    NUMBA_SUPPORT = False
+
+# Set bits per byte, for counting differing letters between charset masks
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+if NUMBA_SUPPORT:
+    @njit(cache=True)
+    def _banded_levenshtein_nb(a: np.ndarray, b: np.ndarray, max_dist: int) -> int:
+        """
+        Banded Levenshtein distance over code point arrays, len(a) >= len(b).
+        Returns max_dist + 1 once the distance exceeds max_dist.
+        """
+        cutoff = max_dist + 1
+        n = b.shape[0]
+        previous_row = np.empty(n + 1, np.int32)
+        current_row = np.empty(n + 1, np.int32)
+        for j in range(n + 1):
+            previous_row[j] = min(j, cutoff)
+        
+        for i in range(a.shape[0]):
+            current_row[:] = cutoff
+            current_row[0] = min(i + 1, cutoff)
+            row_min = current_row[0]
+            for j in range(max(0, i - max_dist), min(n, i + max_dist + 1)):
+                value = previous_row[j] + (1 if a[i] != b[j] else 0)
+                if previous_row[j + 1] + 1 < value:
+                    value = previous_row[j + 1] + 1
+                if current_row[j] + 1 < value:
+                    value = current_row[j] + 1
+                if cutoff < value:
+                    value = cutoff
+                current_row[j + 1] = value
+                if value < row_min:
+                    row_min = value
+            if row_min == cutoff:
+                return cutoff
+            previous_row, current_row = current_row, previous_row
+        
+        return previous_row[n]
+
+
+def _code_points(text: str) -> np.ndarray:
+    """Unicode code points of text as an array, for the JIT-compiled distance."""
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+
+def _charset_mask(text: str) -> int:
+    """Bitmask of the lowercase ASCII letters present in text."""
+    mask = 0
+    for char in text:
+        if "a" <= char <= "z":
+            mask |= 1 << (ord(char) - 97)
+    return mask
+
+
 class MinimumNecessaryFilter:
     """
     Enforces HIPAA minimum necessary rule with LLM enhancement.
@@ -20,7 +99,11 @@ class MinimumNecessaryFilter:
         # Keep the original keyword matching as fallback
         self.use_keywords_fallback = True
         
-        # Dynamic synonym mappings - these will be expanded during runtime
+        # Approximate Sift4 distance for fuzzy matching when rapidfuzz isn't
+        # installed; off by default so matches stay exact Levenshtein
+        self.use_sift4_fallback = False
+        
+        # Synonym mappings (only expanded through learn_new_term)
         self.term_mappings = {}
         self.initialize_term_mappings()
     
@@ -69,17 +152,104 @@ class MinimumNecessaryFilter:
             "blod pressure": "blood_pressure",
             "oxigen": "oxygen_level"
         }
+        
+        # Set per category for constant-time checks in learn_new_term
+        self._term_sets = {category: set(terms) for category, terms in self.term_mappings.items()}
+        
+        self._compile_matcher()
+    
+    def _compile_matcher(self):
+        """
+        Compile all synonyms and typos into a single matcher so the message is
+        scanned in one pass instead of one substring test per term.
+        
+        Uses an Aho-Corasick automaton when pyahocorasick is installed, which
+        reports every occurrence of every term. The regex fallback only finds
+        the longest match at each position, so each term also carries the
+        categories of every shorter term it contains (e.g. "pulse ox" also
+        implies "pulse").
+        """
+        self._matcher_dirty = False
+        term_categories: Dict[str, Set[str]] = {}
+        for data_type, synonyms in self.term_mappings.items():
+            for term in synonyms:
+                term_categories.setdefault(term, set()).add(data_type)
+        for typo, data_type in self.typo_mappings.items():
+            term_categories.setdefault(typo, set()).add(data_type)
+        
+        # Flat synonym list (grouped by category, in mapping order) for batched fuzzy matching
+        self._synonym_strings = [term for synonyms in self.term_mappings.values() for term in synonyms]
+        self._synonym_categories = [
+            data_type for data_type, synonyms in self.term_mappings.items() for _ in synonyms
+        ]
+        self._synonym_lengths = np.array([len(term) for term in self._synonym_strings])
+        self._synonym_masks = np.array(
+            [_charset_mask(term) for term in self._synonym_strings], dtype=np.uint32
+        )
+        
+        if AHOCORASICK_SUPPORT:
+            automaton = ahocorasick.Automaton()
+            for term, categories in term_categories.items():
+                automaton.add_word(term, frozenset(categories))
+            automaton.make_automaton()
+            self._term_automaton = automaton
+            return
+        
+        self._term_automaton = None
+        for term, categories in term_categories.items():
+            for other, other_categories in term_categories.items():
+                if other != term and other in term:
+                    categories |= other_categories
+        
+        alternation = "|".join(
+            re.escape(term) for term in sorted(term_categories, key=len, reverse=True)
+        )
+        # Zero-width lookahead so a match at one position doesn't hide terms starting inside it
+        self._term_pattern = re.compile(f"(?=({alternation}))")
+        self._term_categories = term_categories
+    
+    def _match_categories(self, message: str) -> Set[str]:
+        """
+        Find every category with a synonym or typo in the (lowercased) message.
+        
+        Args:
+            message: The lowercased user message.
+            
+        Returns:
+            The matched categories.
+        """
+        if self._matcher_dirty:
+            self._compile_matcher()
+        
+        matched = set()
+        if self._term_automaton is not None:
+            for _, categories in self._term_automaton.iter(message):
+                matched |= categories
+            return matched
+        
+        for match in self._term_pattern.finditer(message):
+            matched |= self._term_categories[match.group(1)]
+        return matched
     
     def learn_new_term(self, term: str, category: str):
         """
         Dynamically learn new terms and their mappings.
         
+        The filter is shared by all requests, so a learned term widens matching
+        for every user; fuzzy matches are deliberately not learned, since one
+        loose match (e.g. "still" for "pill") would disclose that category on
+        every later message containing the word.
+        
         Args:
             term: The new term to learn.
             category: The category it belongs to.
         """
-        if category in self.term_mappings and term not in self.term_mappings[category]:
+        known_terms = self._term_sets.get(category)
+        if known_terms is not None and term not in known_terms:
+            known_terms.add(term)
             self.term_mappings[category].append(term)
+            # Recompiled on next use, so a fuzzy pass learning several terms compiles once
+            self._matcher_dirty = True
             logger.info(f"Learned new term: '{term}' for category '{category}'")
     
     async def extract(self, message: str, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -100,8 +270,8 @@ class MinimumNecessaryFilter:
             filtered_data = await self.llm_retriever.extract_data_needs(message, data)
             
             # If LLM returned meaningful results, use those
-            if filtered_data and filtered_data != {"summary": "Clinical summary available."} and not any(
-                "error" in value for value in filtered_data.values() if isinstance(value, str)
+            if filtered_data and not is_summary_only(filtered_data) and not any(
+                isinstance(value, str) and "error" in value for value in filtered_data.values()
             ):
                 logger.info(f"Using LLM results: {list(filtered_data.keys())}")
                 return filtered_data
@@ -117,6 +287,31 @@ class MinimumNecessaryFilter:
             logger.error(f"Error in LLM extraction, falling back to keywords: {str(e)}")
             return self._keyword_extract(message, data)
     
+    async def extract_batch(
+        self,
+        messages: List[str],
+        data: Dict[str, Any],
+        concurrency: int = 8
+    ) -> List[Dict[str, Any]]:
+        """
+        Extract relevant data for several messages concurrently.
+        
+        Args:
+            messages: The user messages.
+            data: The available data.
+            concurrency: Maximum number of extractions in flight at once.
+            
+        Returns:
+            Filtered data for each message, in the same order as messages.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def extract_one(message: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.extract(message, data)
+        
+        return await asyncio.gather(*(extract_one(message) for message in messages))
+    
     def _keyword_extract(self, message: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Enhanced keyword-based extraction as fallback.
@@ -132,24 +327,19 @@ class MinimumNecessaryFilter:
         message = message.lower()
         filtered = {}
         
-        # Check each data type using expanded term matching
-        for data_type, synonyms in self.term_mappings.items():
-            if any(term in message for term in synonyms):
-                if data_type in data:
-                    filtered[data_type] = data[data_type]
-        
-        # Check for typos
-        for typo, data_type in self.typo_mappings.items():
-            if typo in message and data_type in data and data_type not in filtered:
+        # Match synonyms and typos in a single pass over the message
+        matched = self._match_categories(message)
+        for data_type in self.term_mappings:
+            if data_type in matched and data_type in data:
                 filtered[data_type] = data[data_type]
         
         # Try fuzzy matching for terms not found
         if not filtered:
-            filtered.update(self._fuzzy_match(message, data))
+            filtered = self._fuzzy_match(message, data)
         
         # fallback → summary only
         if not filtered:
-            filtered["summary"] = "Clinical summary available."
+            filtered["summary"] = SUMMARY_ONLY
         
         return filtered
     
@@ -165,21 +355,98 @@ class MinimumNecessaryFilter:
             Filtered data based on fuzzy matching.
         """
         filtered = {}
-        words = message.split()
+        words = [word for word in message.split() if len(word) > 3]  # Skip very short words
+        
+        # Only categories present in the data can match
+        matchable = sum(1 for data_type in self.term_mappings if data_type in data)
+        if not words or not matchable:
+            return filtered
+        
+        if self._matcher_dirty:
+            self._compile_matcher()
+        
+        if RAPIDFUZZ_SUPPORT:
+            return self._fuzzy_match_batched(words, data, matchable)
+        
+        synonym_strings = self._synonym_strings
+        synonym_categories = self._synonym_categories
         
         # For each word in the message, check if it's similar to any known term
         for word in words:
-            if len(word) <= 3:  # Skip very short words
-                continue
-                
-            for data_type, synonyms in self.term_mappings.items():
-                # Check if the word is similar to any synonym
-                for synonym in synonyms:
-                    if self._is_similar(word, synonym) and data_type in data and data_type not in filtered:
-                        filtered[data_type] = data[data_type]
-                        # Learn this new term for future use
-                        self.learn_new_term(word, data_type)
-                        break
+            candidates = self._edit_distance_candidates(word)
+            for col, synonym in enumerate(synonym_strings):
+                data_type = synonym_categories[col]
+                if data_type not in data or data_type in filtered:
+                    continue
+                # Pairs rejected by the prefilter can still match as substrings
+                if not candidates[col] and word not in synonym and synonym not in word:
+                    continue
+                if self._is_similar(word, synonym):
+                    filtered[data_type] = data[data_type]
+                    if len(filtered) == matchable:
+                        return filtered
+        
+        return filtered
+    
+    def _edit_distance_candidates(self, word: str) -> np.ndarray:
+        """
+        Flag the synonyms that could be within the edit distance threshold of a word.
+        
+        Each edit changes the length by at most one and the set of letters
+        present by at most two, so synonyms whose length or letter set differs
+        by more than that for the allowed number of edits are rejected up front.
+        
+        Args:
+            word: The message word.
+            
+        Returns:
+            Boolean array over the flat synonym list.
+        """
+        if self.use_sift4_fallback:
+            # Sift4 isn't bounded below by these differences
+            return np.ones(len(self._synonym_strings), dtype=bool)
+        
+        max_distances = np.minimum(self._synonym_lengths, len(word)) // 2
+        length_diffs = np.abs(self._synonym_lengths - len(word))
+        differing = self._synonym_masks ^ np.uint32(_charset_mask(word))
+        letter_diffs = _POPCOUNT_TABLE[differing.view(np.uint8)].reshape(-1, 4).sum(axis=1)
+        return (length_diffs <= max_distances) & (letter_diffs <= 2 * max_distances)
+    
+    def _fuzzy_match_batched(self, words: List[str], data: Dict[str, Any], matchable: int) -> Dict[str, Any]:
+        """
+        Same matching as _fuzzy_match, but compares all words against all
+        synonyms in two rapidfuzz calls instead of one _is_similar call per pair.
+        
+        Args:
+            words: The message words longer than three characters.
+            data: The available data.
+            matchable: Number of mapped categories present in the data.
+            
+        Returns:
+            Filtered data based on fuzzy matching.
+        """
+        filtered = {}
+        synonym_categories = self._synonym_categories
+        word_lengths = np.array([len(word) for word in words])
+        min_lengths = np.minimum.outer(word_lengths, self._synonym_lengths)
+        
+        # partial_ratio is 100 exactly when the shorter string is a substring of the longer
+        substring = process.cdist(words, self._synonym_strings, scorer=fuzz.partial_ratio, score_cutoff=100)
+        distances = process.cdist(
+            words, self._synonym_strings,
+            scorer=Levenshtein.distance,
+            score_cutoff=int(min_lengths.max()) // 2
+        )
+        similar = (substring == 100) | ((min_lengths > 3) & (distances <= min_lengths // 2))
+        
+        # Columns are grouped by category in mapping order, matching the loop in _fuzzy_match
+        for row, word in enumerate(words):
+            for col in np.flatnonzero(similar[row]):
+                data_type = synonym_categories[col]
+                if data_type in data and data_type not in filtered:
+                    filtered[data_type] = data[data_type]
+                    if len(filtered) == matchable:
+                        return filtered
         
         return filtered
     
@@ -203,37 +470,128 @@ class MinimumNecessaryFilter:
         if min_len <= 3:
             return False
             
-        # Calculate Levenshtein distance
-        distance = self._levenshtein_distance(word1, word2)
-        
         # Words are similar if the distance is less than half the length of the shorter word
-        return distance <= min_len / 2
+        max_distance = min_len // 2
+        
+        if RAPIDFUZZ_SUPPORT:
+            # Stops early and returns max_distance + 1 once the cutoff is exceeded
+            return Levenshtein.distance(word1, word2, score_cutoff=max_distance) <= max_distance
+        
+        if self.use_sift4_fallback:
+            return self._sift4_distance(word1, word2) <= max_distance
+        
+        # Calculate Levenshtein distance, giving up once it exceeds the threshold
+        distance = self._levenshtein_distance(word1, word2, max_dist=max_distance)
+        return distance <= max_distance
     
-    def _levenshtein_distance(self, s1: str, s2: str) -> int:
+    def _sift4_distance(self, s1: str, s2: str, max_offset: int = 5) -> int:
+        """
+        Approximate edit distance using the simplest Sift4 variant.
+        A single pass with a small look-ahead window instead of a full DP table.
+        
+        Args:
+            s1: First string.
+            s2: Second string.
+            max_offset: How far ahead to search for a matching character.
+            
+        Returns:
+            The approximate distance.
+        """
+        l1, l2 = len(s1), len(s2)
+        if not l1:
+            return l2
+        if not l2:
+            return l1
+        
+        c1 = c2 = 0
+        lcss = 0  # Largest common subsequence
+        local_cs = 0  # Local common substring
+        while c1 < l1 and c2 < l2:
+            if s1[c1] == s2[c2]:
+                local_cs += 1
+            else:
+                lcss += local_cs
+                local_cs = 0
+                if c1 != c2:
+                    c1 = c2 = max(c1, c2)
+                for i in range(max_offset):
+                    if c1 + i < l1 and c2 < l2 and s1[c1 + i] == s2[c2]:
+                        c1 += i
+                        local_cs += 1
+                        break
+                    if c2 + i < l2 and c1 < l1 and s1[c1] == s2[c2 + i]:
+                        c2 += i
+                        local_cs += 1
+                        break
+            c1 += 1
+            c2 += 1
+        lcss += local_cs
+        
+        return max(l1, l2) - lcss
+    
+    def _levenshtein_distance(self, s1: str, s2: str, max_dist: Optional[int] = None) -> int:
         """
         Calculate the Levenshtein distance between two strings.
         
+        With max_dist, only cells within max_dist of the diagonal are computed
+        and the calculation stops as soon as a whole row exceeds it.
+        
         Args:
             s1: First string.
             s2: Second string.
+            max_dist: Largest distance of interest, or None for the exact distance.
             
         Returns:
-            The Levenshtein distance.
+            The Levenshtein distance, or max_dist + 1 if it exceeds max_dist.
         """
         if len(s1) < len(s2):
-            return self._levenshtein_distance(s2, s1)
+            s1, s2 = s2, s1
+        
+        if max_dist is None:
+            max_dist = len(s1)  # The distance never exceeds the longer length
+        elif len(s1) - len(s2) > max_dist:
+            return max_dist + 1
             
         if len(s2) == 0:
             return len(s1)
-            
-        previous_row = range(len(s2) + 1)
+        
+        if NUMBA_SUPPORT:
+            return int(_banded_levenshtein_nb(_code_points(s1), _code_points(s2), max_dist))
+        
+        cutoff = max_dist + 1
+        previous_row = [min(j, cutoff) for j in range(len(s2) + 1)]
         for i, c1 in enumerate(s1):
-            current_row = [i + 1]
-            for j, c2 in enumerate(s2):
-                insertions = previous_row[j + 1] + 1
-                deletions = current_row[j] + 1
-                substitutions = previous_row[j] + (c1 != c2)
-                current_row.append(min(insertions, deletions, substitutions))
+            current_row = [cutoff] * (len(s2) + 1)
+            row_min = current_row[0] = i + 1 if i + 1 < cutoff else cutoff
+            for j in range(max(0, i - max_dist), min(len(s2), i + max_dist + 1)):
+                # Branches instead of min(): this is the innermost loop
+                best = previous_row[j] + (c1 != s2[j])  # Substitution
+                insertion = previous_row[j + 1] + 1
+                if insertion < best:
+                    best = insertion
+                deletion = current_row[j] + 1
+                if deletion < best:
+                    best = deletion
+                if best > cutoff:
+                    best = cutoff
+                current_row[j + 1] = best
+                if best < row_min:
+                    row_min = best
+            if row_min == cutoff:
+                return cutoff
             previous_row = current_row
             
         return previous_row[-1]
+
+
+@lru_cache(maxsize=1)
+def get_minimum_necessary_filter() -> MinimumNecessaryFilter:
+    """
+    Get the process-wide filter, so its compiled matchers and LLM retriever
+    cache are shared across requests instead of rebuilt per call. Requests
+    only read its term mappings.
+    
+    Returns:
+        The shared MinimumNecessaryFilter.
+    """
+    return MinimumNecessaryFilter()
@@ -11,31 +11,235 @@ This module orchestrates the chatbot's interactions, including:
 """
 
 import os
-import json
+import orjson
+import asyncio
 import logging
 import re
+import time
+import hashlib
 import dateparser
-from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Any, AsyncGenerator, Awaitable, Callable, NamedTuple, Optional, Tuple
 from datetime import datetime, timedelta, date
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
-from openai import OpenAI, AsyncOpenAI
 
 from app.models import User
 from app.chatbot.rbac import DataScope
 from app.chatbot.rag import RAGPipeline
 from app.chatbot.phi import PHIMasker
-from app.chatbot.minimum_necessary import MinimumNecessaryFilter
+from app.chatbot.minimum_necessary import get_minimum_necessary_filter
+from app.chatbot.query_router import QueryRouter, get_query_router
+from app.chatbot.semcache import answer_cache, rag_cache, response_cache
+from app.chatbot.response_cache import ResponseCache
 from app.chatbot.response_guard import sanitize_response
 from app.chatbot.audit import log_chat_interaction
 from app.chatbot.consent import has_patient_consent
+from app.chatbot.llm_client import get_openai_client, llm_semaphore
+from app.chatbot.coalescer import BatchCoalescer
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-client = AsyncOpenAI(api_key=os.getenv("LLM_API_KEY"))
+# Token counting for model routing (optional, falls back to a character estimate)
+try:
+    import tiktoken
+    TIKTOKEN_SUPPORT = True
+except ImportError:
+    TIKTOKEN_SUPPORT = False
+
+# Models per cost tier; explanations and other light answers use the cheap tier
+MODEL_BY_TIER = {
+    "cheap": os.getenv("LLM_CHEAP_MODEL", "gpt-4o-mini"),
+    "premium": os.getenv("LLM_PREMIUM_MODEL", "gpt-4o"),
+}
+
+# Contexts longer than this (in tokens) always go to the premium tier
+PREMIUM_CONTEXT_TOKENS = int(os.getenv("LLM_PREMIUM_CONTEXT_TOKENS", "6000"))
+
+# Analytics age groups: width_bucket(age, AGE_GROUP_BOUNDS) indexes AGE_GROUP_LABELS
+AGE_GROUP_BOUNDS = [19, 36, 51, 66]
+AGE_GROUP_LABELS = ("0-18", "19-35", "36-50", "51-65", "65+")
+
+# Completion token budget per query type; generation time grows with the budget
+MAX_TOKENS_BY_QUERY_TYPE = {
+    "data": 250,
+    "action": 250,
+    "recommendation": 400,
+    "explanation": 400,
+    "analytics": 500
+}
+DEFAULT_MAX_TOKENS = 500
+
+# How long a cached chat response may be served, by the kind of data it drew on.
+# A response is only as fresh as its most volatile source. Responses drawing on
+# anything not listed here are never cached: a semantic match can't tell apart the
+# patient, day or consent behind a patient or hospital record answer, and actions
+# must always run.
+RESPONSE_CACHE_TTL_SECONDS = {
+    "analytics": 900,
+    "medical_knowledge": 3600,
+    "recommendation_context": 3600,
+}
+
+# Batch API polling for bulk (non-interactive) generation
+BATCH_POLL_SECONDS = float(os.getenv("LLM_BATCH_POLL_SECONDS", "30"))
+BATCH_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# Marks the de-identified data message in the LLM context
+DATA_CONTEXT_PREFIX = "De-identified clinical summary:\n"
+
+# Returned when the LLM call fails
+GENERATION_ERROR_MESSAGE = "I'm sorry, I encountered an error processing your request. Please try again later."
+
+# Date patterns for wearable queries, tried in order; the first that matches and
+# parses wins, so explicit "on <date>"/"for <date>" phrasings take precedence
+_MONTH = r'(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)'
+_DAY = r'\d{1,2}(?:st|nd|rd|th)?'
+DATE_PATTERNS = [re.compile(pattern) for pattern in (
+    # Patterns with spaces between day and month
+    rf'on\s+({_DAY}\s+(?:of\s+)?{_MONTH}\s+\d{{4}})',
+    rf'on\s+({_DAY}\s+(?:of\s+)?{_MONTH})',
+    r'on\s+(\d{4}-\d{1,2}-\d{1,2})',
+    r'on\s+(\d{1,2}/\d{1,2}/\d{2,4})',
+    r'on\s+(\d{1,2}-\d{1,2}-\d{2,4})',
+    rf'for\s+({_DAY}\s+(?:of\s+)?{_MONTH}\s+\d{{4}})',
+    rf'for\s+({_DAY}\s+(?:of\s+)?{_MONTH})',
+    r'for\s+(\d{4}-\d{1,2}-\d{1,2})',
+    r'for\s+(\d{1,2}/\d{1,2}/\d{2,4})',
+    r'for\s+(\d{1,2}-\d{1,2}-\d{2,4})',
+    rf'({_DAY}\s+(?:of\s+)?{_MONTH}\s+\d{{4}})',
+    rf'({_DAY}\s+(?:of\s+)?{_MONTH})',
+    r'(\d{4}-\d{1,2}-\d{1,2})',
+    r'(\d{1,2}/\d{1,2}/\d{2,4})',
+    r'(\d{1,2}-\d{1,2}-\d{2,4})',
+    
+    # Patterns without spaces between day and month (e.g., "25december2025")
+    rf'({_DAY}{_MONTH}\d{{4}})',
+    rf'({_DAY}{_MONTH}\d{{2}})',
+    rf'on\s+({_DAY}{_MONTH}\d{{4}})',
+    rf'for\s+({_DAY}{_MONTH}\d{{4}})'
+)]
+
+# Every date pattern needs a digit, so one scan for a digit rules them all out
+DIGIT_RE = re.compile(r'\d')
+
+# Whole numbers in a message, checked against the allowed patient IDs
+PATIENT_ID_RE = re.compile(r"\b(\d+)\b")
+
+
+class PatientName(NamedTuple):
+    """The fields of a patient needed to match names in a message."""
+    id: int
+    first_name: str
+    last_name: str
+
+
+class PatientNameIndex(NamedTuple):
+    """Accessible patients plus a lowercase name token -> patient positions map."""
+    patients: Tuple[PatientName, ...]
+    tokens: Dict[str, Tuple[int, ...]]
+
+
+@lru_cache(maxsize=1)
+def _get_token_encoding():
+    """Load the gpt-4o tokenizer once, or return None if it isn't available."""
+    if not TIKTOKEN_SUPPORT:
+        return None
+    try:
+        return tiktoken.encoding_for_model("gpt-4o")
+    except Exception as e:
+        logger.warning(f"Could not load tiktoken encoding, estimating tokens from length: {e}")
+        return None
+
+
+def estimate_tokens(context: List[Dict[str, str]]) -> int:
+    """
+    Estimate the number of prompt tokens in a chat context.
+    
+    Args:
+        context: The context for the LLM.
+        
+    Returns:
+        The estimated token count.
+    """
+    encoding = _get_token_encoding()
+    if encoding is None:
+        return sum(len(msg["content"]) for msg in context) // 4
+    return sum(len(encoding.encode(msg["content"])) for msg in context)
+
+
+def select_model_tier(query_type: str, role: Optional[str], context: List[Dict[str, str]]) -> str:
+    """
+    Pick the model tier for generating a response.
+    
+    Analytics and doctor data questions need the premium model; explanations,
+    recommendations, actions and patient-facing data summaries use the cheap one.
+    
+    Args:
+        query_type: The type of query (can be a hybrid type like 'data+explanation').
+        role: The user's role.
+        context: The context for the LLM.
+        
+    Returns:
+        The tier name, a key of MODEL_BY_TIER.
+    """
+    query_types = query_type.split("+")
+    if "analytics" in query_types:
+        return "premium"
+    if role in {"doctor", "hospital"} and "data" in query_types:
+        return "premium"
+    if estimate_tokens(context) > PREMIUM_CONTEXT_TOKENS:
+        return "premium"
+    return "cheap"
+
+
+def max_tokens_for(query_type: Optional[str]) -> int:
+    """
+    Pick the completion token budget for a query type.
+    
+    Lookups need a short answer, explanations and analyses a long one; a hybrid
+    type gets the largest budget of its parts.
+    
+    Args:
+        query_type: The type of query (can be a hybrid type like 'data+explanation').
+        
+    Returns:
+        The max_tokens value for the completion.
+    """
+    if not query_type:
+        return DEFAULT_MAX_TOKENS
+    return max(MAX_TOKENS_BY_QUERY_TYPE.get(qt, DEFAULT_MAX_TOKENS) for qt in query_type.split("+"))
+
+
+def response_cache_ttl(data_accessed: List[str]) -> Optional[float]:
+    """
+    Pick how long a chat response may be served from cache.
+    
+    Args:
+        data_accessed: The data sources the response drew on (e.g. 'patient_data:42').
+        
+    Returns:
+        The TTL in seconds, or None if the response must not be cached.
+    """
+    # Without any data the answer is usually a refusal (e.g. a patient outside the
+    # scope), which must not be served for a similar question that is allowed
+    if not data_accessed:
+        return None
+    ttls = [RESPONSE_CACHE_TTL_SECONDS.get(source.split(":", 1)[0]) for source in data_accessed]
+    if None in ttls:
+        return None
+    return min(ttls)
+
+
+class BulkChatRequest(NamedTuple):
+    """A chat request replayed through the bulk (Batch API) path."""
+    request_id: str
+    user: User
+    message: str
+    data_scope: DataScope
+    previous_messages: List["Message"] = []
 
 
 class Message(BaseModel):
@@ -49,6 +253,189 @@ class ChatResponse(BaseModel):
     response: str
     query_type: str
     data_accessed: Optional[List[str]] = None
+    # Context sent to the LLM, kept for audit logging only (never serialized)
+    context: Optional[List[Dict[str, str]]] = Field(default=None, exclude=True)
+
+
+# System prompt pieces. The instructions come first and only depend on the role and
+# query type, so OpenAI's prompt cache can reuse them; the scope and time go last.
+SYSTEM_PROMPT_HEAD = """
+        You are CareIQ, a healthcare assistant for the Patient360 platform.
+        If you get the data as empty then respond the answer correctly rather than "I don't have that information".
+        You provide accurate, helpful information based on the data available to you.
+        You NEVER make up information or hallucinate data that isn't provided to you.
+        If you don't have specific information, say so clearly.
+        If you have any queries relevant to upcoming appointment or something which needs time comparison of data to answer then use the current date and time given at the end of these instructions to analyze the data coming to you and then answer accordingly.
+        while answering the queries be mindful of the past present and future of the data.
+        CRITICAL ERROR HANDLING:
+        - If you see an error message in the data (e.g., "error": "Error getting daily vitals"),
+          clearly explain to the user that there was a technical issue retrieving their data.
+        - Be transparent about system errors while maintaining a reassuring tone.
+        - When data contains error messages, acknowledge them directly in your response.
+        
+        CRITICAL PHI PROTECTION RULES:
+        - The data provided to you has been de-identified for privacy protection
+        - DO NOT attempt to re-identify patients or infer protected information
+        - DO NOT include specific dates, names, or identifiers in your responses
+        - Focus on clinical insights and general patterns, not individual identifiers
+        """
+
+ROLE_PROMPTS = {
+    "patient": """
+            You are speaking directly to a patient about their own health data.
+            Use a friendly, supportive tone and avoid medical jargon when possible.
+            Explain medical terms in simple language.
+            ONLY discuss the patient's own data, never mention other patients.
+            
+            When technical errors occur (indicated by error messages in the data),
+            be transparent but reassuring. Explain that their data couldn't be retrieved
+            due to a temporary technical issue, and suggest they try again later or
+            contact support if the problem persists.
+            """,
+    
+    "doctor": """
+            You are speaking to a healthcare provider about patient data.
+            Use professional medical terminology and be precise.
+            You can reference specific lab values, medications, and clinical findings.
+            Only discuss patients that this doctor has treated.
+            
+            IMPORTANT: When a doctor mentions a patient by name, the system will automatically
+            identify the correct patient based on the name. If multiple patients have similar names,
+            the system will use recent interactions to determine the most likely patient.
+            """,
+    
+    "hospital": """
+            You are speaking to a hospital administrator about hospital-level data.
+            Focus on aggregated statistics and trends, not individual patient details.
+            Use business and healthcare administration terminology.
+            Highlight operational insights and efficiency metrics.
+            """
+}
+
+QUERY_PROMPTS = {
+    "data": """
+            You are providing specific data from the patient record.
+            Be precise and factual, citing dates and values when available.
+            Only share data that is explicitly provided in the context.
+            Remember: dates and names have been de-identified for privacy.
+            
+            IMPORTANT: If you encounter an error message in the data (e.g., "error": "Error getting daily vitals"),
+            clearly communicate to the user that there was a technical issue retrieving the requested information.
+            Explain that their data could not be accessed at this time due to a system error.
+            """,
+    
+    "explanation": """
+            You are explaining medical concepts or terminology.
+            Provide clear, accurate explanations at an appropriate level for the user.
+            Use analogies or simplified explanations when helpful.
+            """,
+    
+    "analytics": """
+            You are providing analysis of aggregated healthcare data.
+            Focus on trends, patterns, and insights from the data.
+            Avoid discussing individual patients and focus on population-level insights.
+            """,
+    
+    "recommendation": """
+            You are providing health recommendations based on patient data.
+            Be cautious and conservative in your recommendations.
+            Always clarify that these are general suggestions, not medical advice.
+            Encourage the user to consult with their healthcare provider for personalized advice.
+            """,
+    
+    "action": """
+            You are helping the user perform healthcare-related actions.
+            Guide them through the process of scheduling appointments, requesting medication refills,
+            or contacting their healthcare provider.
+            Be clear about what actions are available and how to initiate them.
+            """,
+    
+    # Hybrid prompts for common combinations
+    "data+explanation": """
+            You are providing specific patient data AND explaining what it means.
+            First present the data clearly and factually, then explain its significance.
+            Use simple language to help the patient understand their health information.
+            Remember to check for error messages in the data and communicate them clearly.
+            """,
+    
+    "data+recommendation": """
+            You are providing specific patient data AND offering general health recommendations.
+            Present the data first, then offer context-appropriate suggestions.
+            Be very clear that your recommendations are general in nature, not medical advice.
+            Always encourage consulting with a healthcare provider for personalized guidance.
+            """,
+    
+    "explanation+recommendation": """
+            You are explaining medical concepts AND offering general health recommendations.
+            Provide clear explanations of medical terms or concepts first.
+            Then offer general recommendations related to the topic.
+            Be very clear that your recommendations are general in nature, not medical advice.
+            """
+}
+
+# Per-role access restriction appended after the allowed data types
+SCOPE_PROMPTS = {
+    "patient": "You can ONLY discuss the patient's own health data, never other patients.",
+    "doctor": "You can ONLY discuss patients with these IDs: {patient_ids}.",
+    "hospital": "You can ONLY discuss aggregated data for hospital ID: {hospital_id}."
+}
+
+
+@lru_cache(maxsize=64)
+def build_static_system_prompt(role: str, query_type: str) -> str:
+    """
+    Assemble the instructions part of the system prompt.
+    
+    Args:
+        role: The user's role.
+        query_type: The type of query.
+        
+    Returns:
+        The instructions, identical for every request with this role and query type.
+    """
+    parts = [SYSTEM_PROMPT_HEAD]
+    
+    if role in ROLE_PROMPTS:
+        parts.append(ROLE_PROMPTS[role])
+    
+    # Handle hybrid query types
+    if "+" in query_type and query_type not in QUERY_PROMPTS:
+        # If no specific hybrid prompt, combine individual prompts
+        parts.extend(QUERY_PROMPTS[qt] for qt in query_type.split("+") if qt in QUERY_PROMPTS)
+    elif query_type in QUERY_PROMPTS:
+        parts.append(QUERY_PROMPTS[query_type])
+    
+    return "\n\n".join(parts)
+
+
+@lru_cache(maxsize=2048)
+def build_system_prompt_scope(
+    role: str,
+    allowed_data_types: Tuple[str, ...],
+    patient_ids: Tuple[int, ...],
+    hospital_id: Optional[int]
+) -> str:
+    """
+    Assemble the data scope part of the system prompt.
+    
+    Args:
+        role: The user's role.
+        allowed_data_types: The data types the user can access, sorted.
+        patient_ids: The patient IDs a doctor can access (empty for other roles).
+        hospital_id: The hospital ID for hospital users.
+        
+    Returns:
+        The scope section.
+    """
+    parts = [f"You can ONLY access the following data types: {', '.join(allowed_data_types)}."]
+    
+    if role in SCOPE_PROMPTS:
+        parts.append(SCOPE_PROMPTS[role].format(
+            patient_ids=list(patient_ids),
+            hospital_id=hospital_id if hospital_id is not None else 'None'
+        ))
+    
+    return "\n\n" + "\n\n".join(parts)
 
 
 class ChatOrchestrator:
@@ -64,6 +451,10 @@ class ChatOrchestrator:
     - PHI protection and compliance
     """
     
+    # Per-scope patient name indexes (entries, seconds)
+    PATIENT_INDEX_CACHE_SIZE = 128
+    PATIENT_INDEX_TTL = 300
+    
     def __init__(self, rag_pipeline: RAGPipeline):
         """
         Initialize the chat orchestrator.
@@ -73,6 +464,46 @@ class ChatOrchestrator:
         """
         self.rag_pipeline = rag_pipeline
         self.phi_masker = PHIMasker()  # Initialize PHI masker
+        
+        # sorted allowed patient IDs -> (PatientNameIndex, built_at), least recently used first
+        self._patient_indexes: "OrderedDict[Tuple[int, ...], Tuple[PatientNameIndex, float]]" = OrderedDict()
+        
+        # Hospital aggregates keyed by (hospital_id, day); read-only, so they expire by TTL only
+        self._hospital_cache = ResponseCache(max_size=256, ttl_seconds=300)
+        self._analytics_cache = ResponseCache(max_size=256, ttl_seconds=900)
+        self._aggregate_locks: Dict[Tuple[str, int, date], asyncio.Lock] = {}
+        
+        # De-identified patient records keyed by a digest of the filtered record, so
+        # follow-up turns over unchanged data skip NER; changed data gets a new key
+        self._deidentified_cache = ResponseCache(max_size=1024, ttl_seconds=900)
+        
+        # Query types of recent messages, keyed by the stripped, lowercased message
+        self._query_type_cache = ResponseCache(max_size=2048, ttl_seconds=86400)
+        
+        # Concurrent questions with identical contexts share one completion (opt-in)
+        self._coalescer = BatchCoalescer()
+    
+    async def warmup(self) -> None:
+        """
+        Prime lazily initialized components at startup: the spaCy pipeline,
+        the local intent classifier, the query router, the minimum necessary
+        filter and the OpenAI connection.
+        """
+        from app.chatbot.llm_retriever import get_local_intent_classifier
+        
+        self.phi_masker.deidentify_text("Warmup note for John Smith, phone 5555555555.")
+        sanitize_response("Warmup response.")
+        get_local_intent_classifier()
+        get_query_router()
+        get_minimum_necessary_filter()
+        
+        try:
+            # Opens the TLS connection so the first chat doesn't pay for it
+            await get_openai_client().models.list()
+        except Exception as e:
+            logger.warning(f"OpenAI warmup failed (non-critical): {e}")
+        
+        logger.info("Chat orchestrator warmed up")
     
     async def process_chat_request(
         self,
@@ -80,7 +511,9 @@ class ChatOrchestrator:
         message: str,
         previous_messages: List[Message],
         data_scope: DataScope,
-        db: AsyncSession = None
+        db: AsyncSession = None,
+        query_type: Optional[str] = None,
+        classify_task: Optional["asyncio.Task[str]"] = None
     ) -> ChatResponse:
         """
         Process a chat request.
@@ -91,13 +524,82 @@ class ChatOrchestrator:
             previous_messages: Previous messages in the conversation.
             data_scope: The user's data scope.
             db: The database session.
+            query_type: The query type, if the caller already classified the message.
+            classify_task: A classification of the message the caller already started;
+                speculative work runs alongside whatever of it is left.
             
         Returns:
             The chatbot's response.
         """
+        # A standalone question asked again over the same scope is answered from cache.
+        # Only answers that read no patient records are stored, so a hit never needs the
+        # patient or consent resolved; follow-ups depend on the conversation, so they
+        # always run the pipeline
+        cache_key = None
+        if not previous_messages:
+            cache_key = await self._response_cache_key(user, message, data_scope)
+        if cache_key is not None:
+            cached = response_cache.get(*cache_key)
+            if cached is not None:
+                logger.info("Using cached chat response")
+                response, cached_query_type, data_accessed, context = cached
+                
+                # CRITICAL: Cached answers are audited like generated ones
+                await log_chat_interaction(
+                    user_id=user.id,
+                    message=message,
+                    response=response,
+                    query_type=cached_query_type,
+                    data_accessed=list(data_accessed),
+                    context=context,
+                    db=db
+                )
+                return ChatResponse(
+                    response=response,
+                    query_type=cached_query_type,
+                    data_accessed=list(data_accessed),
+                    context=context
+                )
+        
         # Classify query
-        query_type = await self._classify_query(message)
-        logger.info(f"Query type: {query_type}")
+        patient_id = None
+        knowledge_task = None
+        if query_type is None:
+            # Start work the query will probably need while it is classified; each
+            # speculative task is dropped if the classification doesn't call for it
+            prefetch_task = None
+            if user.role == "doctor" and db is not None:
+                # Resolve the patient the message refers to
+                prefetch_task = asyncio.create_task(
+                    self._prefetch_patient_id(message, data_scope.patient_ids)
+                )
+            classified = classify_task is not None and classify_task.done()
+            if not classified and self._classification_is_slow(message):
+                # Classification needs the embedding model or the LLM, long enough
+                # to hide most of a knowledge base search behind it
+                knowledge_task = asyncio.create_task(self._query_knowledge(user, message))
+            
+            try:
+                if classify_task is not None:
+                    query_type = await classify_task
+                else:
+                    query_type = await self._classify_query(message)
+            except BaseException:
+                for task in (prefetch_task, knowledge_task):
+                    if task is not None:
+                        task.cancel()
+                raise
+            
+            query_types = query_type.split("+")
+            if prefetch_task is not None:
+                if "data" in query_types:
+                    patient_id = await prefetch_task
+                else:
+                    await self._discard_task(prefetch_task)
+            if knowledge_task is not None and not {"explanation", "recommendation"} & set(query_types):
+                await self._discard_task(knowledge_task)
+                knowledge_task = None
+        logger.info("Query type: %s", query_type)
         
         # Retrieve relevant data
         data, data_accessed = await self._retrieve_data(
@@ -105,7 +607,9 @@ class ChatOrchestrator:
             message=message,
             query_type=query_type,
             data_scope=data_scope,
-            db=db
+            db=db,
+            patient_id=patient_id,
+            knowledge_task=knowledge_task
         )
         
         # Build context with PHI protection
@@ -119,13 +623,12 @@ class ChatOrchestrator:
         )
         
         # Log the context being sent to the LLM
-        logger.info(f"Query type: {query_type}")
-        logger.info(f"System prompt: {context[0]['content']}")
+        logger.debug("System prompt: %s", context[0]['content'])
         if len(context) > 1 and context[1]['role'] == 'system':
-            logger.info(f"Data context: {context[1]['content']}")
+            logger.debug("Data context: %s", context[1]['content'])
         
         # Generate response
-        response = await self._generate_response(context)
+        response = await self._generate_response_cached(context, query_type, user.role, data_scope)
         
         # CRITICAL: Sanitize response to prevent PHI leakage
         response = sanitize_response(response)
@@ -136,40 +639,231 @@ class ChatOrchestrator:
             data_scope=data_scope
         )
         
-        # Ensure data_accessed is always a list before logging
-        if not isinstance(data_accessed, list):
-            if data_accessed is None:
-                data_accessed_for_log = []
-            else:
-                data_accessed_for_log = [str(data_accessed)]
-        else:
-            data_accessed_for_log = data_accessed
-            
         # CRITICAL: Audit log the interaction for HIPAA compliance
         await log_chat_interaction(
             user_id=user.id,
             message=message,
             response=validated_response,
             query_type=query_type,
-            data_accessed=data_accessed_for_log,
+            data_accessed=data_accessed,
             context=context,
             db=db
         )
-        # Ensure data_accessed is always a list before creating ChatResponse
-        if not isinstance(data_accessed, list):
-            if data_accessed is None:
-                data_accessed_list = []
-            else:
-                data_accessed_list = [str(data_accessed)]
-        else:
-            data_accessed_list = data_accessed
+        
+        ttl = response_cache_ttl(data_accessed)
+        if cache_key is not None and ttl is not None and response != GENERATION_ERROR_MESSAGE:
+            response_cache.put(
+                *cache_key,
+                (validated_response, query_type, tuple(data_accessed), context),
+                ttl_seconds=ttl
+            )
             
         return ChatResponse(
             response=validated_response,
             query_type=query_type,
-            data_accessed=data_accessed_list
+            data_accessed=data_accessed,
+            context=context
         )
     
+    async def process_chat_request_bulk(
+        self,
+        requests: List[BulkChatRequest],
+        db: AsyncSession
+    ) -> Dict[str, ChatResponse]:
+        """
+        Process many chat requests for offline workloads (audit replay, QA runs).
+        
+        Classification, retrieval and context building run as usual; the LLM
+        calls are submitted as one OpenAI Batch API job, which costs half as much
+        but may take up to 24 hours. Interactive requests must keep using
+        process_chat_request.
+        
+        Args:
+            requests: The requests to process, with unique request IDs.
+            db: The database session.
+            
+        Returns:
+            Responses keyed by request ID.
+        """
+        prepared = {}
+        for request in requests:
+            query_type = await self._classify_query(request.message)
+            data, data_accessed = await self._retrieve_data(
+                user=request.user,
+                message=request.message,
+                query_type=query_type,
+                data_scope=request.data_scope,
+                db=db
+            )
+            context = await self._build_context(
+                user=request.user,
+                message=request.message,
+                previous_messages=request.previous_messages,
+                query_type=query_type,
+                data=data,
+                data_scope=request.data_scope
+            )
+            model = MODEL_BY_TIER[select_model_tier(query_type, request.user.role, context)]
+            prepared[request.request_id] = (request, query_type, data_accessed or [], context, model)
+        
+        generated = await self._generate_responses_batch({
+            request_id: (context, model, max_tokens_for(query_type))
+            for request_id, (_, query_type, _, context, model) in prepared.items()
+        })
+        
+        responses = {}
+        for request_id, (request, query_type, data_accessed, context, _) in prepared.items():
+            response = sanitize_response(generated.get(request_id, GENERATION_ERROR_MESSAGE))
+            validated_response = self._validate_response(
+                response=response,
+                data_scope=request.data_scope
+            )
+            
+            # Replays are audited like live requests
+            await log_chat_interaction(
+                user_id=request.user.id,
+                message=request.message,
+                response=validated_response,
+                query_type=query_type,
+                data_accessed=data_accessed,
+                context=context,
+                db=db
+            )
+            responses[request_id] = ChatResponse(
+                response=validated_response,
+                query_type=query_type,
+                data_accessed=data_accessed,
+                context=context
+            )
+        
+        return responses
+    
+    async def _generate_responses_batch(
+        self,
+        contexts: Dict[str, Tuple[List[Dict[str, str]], str, int]]
+    ) -> Dict[str, str]:
+        """
+        Generate responses for many contexts with one OpenAI Batch API job.
+        
+        Args:
+            contexts: (context, model, max_tokens) keyed by request ID.
+            
+        Returns:
+            Generated responses keyed by request ID; failed requests are missing.
+        """
+        if not contexts:
+            return {}
+        
+        client = get_openai_client()
+        lines = [
+            orjson.dumps({
+                "custom_id": request_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": model,
+                    "messages": context,
+                    "temperature": 0.3,
+                    "max_tokens": max_tokens
+                }
+            }).decode()
+            for request_id, (context, model, max_tokens) in contexts.items()
+        ]
+        
+        try:
+            batch_file = await client.files.create(
+                file=("chat_batch.jsonl", "\n".join(lines).encode(), "application/jsonl"),
+                purpose="batch"
+            )
+            batch = await client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            logger.info(f"Submitted batch {batch.id} with {len(lines)} chat requests")
+            
+            while batch.status not in BATCH_FINAL_STATUSES:
+                await asyncio.sleep(BATCH_POLL_SECONDS)
+                batch = await client.batches.retrieve(batch.id)
+            
+            if not batch.output_file_id:
+                logger.error(f"Batch {batch.id} ended with status {batch.status} and no output")
+                return {}
+            if batch.status != "completed":
+                # Expired and cancelled batches still return the requests that finished
+                logger.warning(f"Batch {batch.id} ended with status {batch.status}, keeping partial results")
+            
+            output = await client.files.content(batch.output_file_id)
+        except Exception as e:
+            logger.error(f"Error running chat batch: {e}")
+            return {}
+        
+        # Results come back in any order; match them up by custom_id
+        responses = {}
+        for line in output.text.splitlines():
+            if not line:
+                continue
+            result = orjson.loads(line)
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                logger.error(f"Batch request {result.get('custom_id')} failed: {result.get('error')}")
+                continue
+            content = response["body"]["choices"][0]["message"]["content"] or ""
+            responses[result["custom_id"]] = content.strip()
+        
+        return responses
+    
+    async def _response_cache_key(
+        self,
+        user: User,
+        message: str,
+        data_scope: DataScope
+    ) -> Optional[Tuple[str, Any]]:
+        """
+        Build the response cache partition and query embedding for a message.
+        
+        Args:
+            user: The user making the request.
+            message: The user's message.
+            data_scope: The user's data scope.
+            
+        Returns:
+            A (namespace, vector) tuple, or None if the query router isn't available.
+        """
+        router = get_query_router()
+        if router is None:
+            return None
+        
+        # Responses are per user: they can quote the user's own records
+        namespace = hashlib.blake2b(
+            orjson.dumps([user.id, data_scope.cache_key()]), digest_size=16
+        ).hexdigest()
+        return namespace, await asyncio.to_thread(router.embed, message)
+    
+    def _classification_is_slow(self, message: str) -> bool:
+        """
+        Whether classifying a message goes beyond the cache and keyword rules.
+        
+        Args:
+            message: The user's message.
+            
+        Returns:
+            True if the embedding model or the LLM will be needed.
+        """
+        if self._query_type_cache.get(message.strip().lower()) is not None:
+            return False
+        return QueryRouter.classify_by_rules(message) is None
+    
+    @staticmethod
+    async def _discard_task(task: asyncio.Task) -> None:
+        """Cancel a speculative task whose result turned out not to be needed."""
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            # The work wasn't needed, so neither is its outcome
+            pass
+    
     async def _classify_query(self, message: str) -> str:
         """
         Classify the user's query.
@@ -181,13 +875,49 @@ class ChatOrchestrator:
             The query type: Can be a single type ('data', 'explanation', 'analytics')
             or a hybrid type (e.g., 'data+explanation').
         """
+        cache_key = message.strip().lower()
+        query_type = self._query_type_cache.get(cache_key)
+        if query_type is not None:
+            logger.info("Classified query as: %s (cached)", query_type)
+            return query_type
+        
+        # Route locally (rules, then sentence embeddings); the LLM is only
+        # used when the local router couldn't be loaded and no rule matched
+        query_type = None
+        router = get_query_router()
+        if router is not None:
+            try:
+                query_type = await router.classify(message)
+                logger.info("Classified query as: %s", query_type)
+            except Exception as e:
+                logger.error(f"Error in local query routing, falling back to LLM: {e}")
+        else:
+            # The keyword rules don't need the embedding model
+            query_type = QueryRouter.classify_by_rules(message)
+            if query_type is not None:
+                logger.info("Classified query as: %s (rules)", query_type)
+        
+        if query_type is None:
+            query_type = await self._classify_query_llm(message)
+        
+        self._query_type_cache.put(cache_key, query_type)
+        return query_type
+    
+    async def _classify_query_llm(self, message: str) -> str:
+        """
+        Classify the user's query with the LLM.
+        
+        Args:
+            message: The user's message.
+            
+        Returns:
+            The query type, single or hybrid.
+        """
         # Use OpenAI to classify the query
-        response = await client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": """
+        messages = [
+            {
+                "role": "system",
+                "content": """
                     You are a query classifier for a healthcare chatbot. Analyze the query and determine which categories it falls into.
                     
                     Categories:
@@ -208,12 +938,17 @@ class ChatOrchestrator:
                     
                     Respond with ONLY the category name or combined categories, nothing else.
                     """
-                },
-                {"role": "user", "content": message}
-            ],
-            temperature=0.1,
-            max_tokens=30
-        )
+            },
+            {"role": "user", "content": message}
+        ]
+        
+        async with llm_semaphore:
+            response = await get_openai_client().chat.completions.create(
+                model=MODEL_BY_TIER["cheap"],
+                messages=messages,
+                temperature=0.1,
+                max_tokens=30
+            )
         
         # Extract the query type from the response
         query_type = response.choices[0].message.content.strip().lower()
@@ -235,7 +970,7 @@ class ChatOrchestrator:
         elif query_type not in primary_types:
             query_type = "explanation"  # Default to explanation for invalid single types
         
-        logger.info(f"Classified query as: {query_type}")
+        logger.info("Classified query as: %s", query_type)
         return query_type
     
     async def _retrieve_data(
@@ -244,7 +979,9 @@ class ChatOrchestrator:
         message: str,
         query_type: str,
         data_scope: DataScope,
-        db: AsyncSession = None
+        db: AsyncSession = None,
+        patient_id: Optional[int] = None,
+        knowledge_task: Optional["asyncio.Task[List[Dict[str, Any]]]"] = None
     ) -> Tuple[Dict[str, Any], List[str]]:
         """
         Retrieve relevant data based on the query type and data scope.
@@ -256,6 +993,8 @@ class ChatOrchestrator:
             query_type: The type of query (can be a hybrid type like 'data+explanation').
             data_scope: The user's data scope.
             db: The database session.
+            patient_id: The patient a doctor's message refers to, if already resolved.
+            knowledge_task: A knowledge base search already started for the message.
             
         Returns:
             A tuple of (data, data_accessed).
@@ -265,48 +1004,31 @@ class ChatOrchestrator:
         
         if db is None:
             logger.warning("No database session provided, cannot retrieve real data")
+            if knowledge_task is not None:
+                knowledge_task.cancel()
             return data, data_accessed
         
         # Split query_type into components if it's a hybrid type
         query_types = query_type.split("+")
-        logger.info(f"Processing query types: {query_types}")
-        
-        # Import the enhanced minimum necessary filter
-        from app.chatbot.minimum_necessary import MinimumNecessaryFilter
-        min_necessary_filter = MinimumNecessaryFilter()
-        
-        # Process each query type component
-        if "data" in query_types:
-            # For data queries, retrieve specific patient data
-            if user.role == "patient":
-                # Patient can only access their own data
-                patient_data = await self._get_patient_data(
-                    patient_id=data_scope.patient_ids[0] if data_scope.patient_ids else None,
-                    message=message,
-                    data_scope=data_scope,
-                    db=db
-                )
-                
-                # Get all available data first
-                all_patient_data = patient_data.get("data", {})
-                
-                # Apply the LLM-enhanced filter
-                filtered_data = await min_necessary_filter.extract(message, all_patient_data)
-                
-                # Update the patient_data with filtered data
-                patient_data["data"] = filtered_data
-                
-                data["patient_data"] = patient_data
-                data_accessed.append("patient_data")
-            
-            elif user.role == "doctor":
-                # Doctor can access data for patients they have treated
-                # First, extract patient name or ID from the message
-                patient_id = await self._extract_patient_id(message, data_scope.patient_ids, db)
-                
-                if patient_id and patient_id in data_scope.patient_ids:
+        logger.info("Processing query types: %s", query_types)
+        
+        # Shared minimum necessary filter
+        min_necessary_filter = get_minimum_necessary_filter()
+        
+        # Knowledge retrieval doesn't touch the database, so it runs while the
+        # data branches below use the session; explanation and recommendation share it
+        rag_task = knowledge_task
+        if rag_task is None and ("explanation" in query_types or "recommendation" in query_types):
+            rag_task = asyncio.create_task(self._query_knowledge(user, message))
+        
+        try:
+            # Process each query type component
+            if "data" in query_types:
+                # For data queries, retrieve specific patient data
+                if user.role == "patient":
+                    # Patient can only access their own data
                     patient_data = await self._get_patient_data(
-                        patient_id=patient_id,
+                        patient_id=data_scope.patient_ids[0] if data_scope.patient_ids else None,
                         message=message,
                         data_scope=data_scope,
                         db=db
@@ -322,70 +1044,100 @@ class ChatOrchestrator:
                     patient_data["data"] = filtered_data
                     
                     data["patient_data"] = patient_data
-                    data_accessed.append(f"patient_data:{patient_id}")
-            
-            elif user.role == "hospital":
-                # Hospital admin can access aggregated data
-                hospital_data = await self._get_hospital_data(
-                    hospital_id=data_scope.hospital_ids[0] if data_scope.hospital_ids else None,
-                    message=message,
-                    data_scope=data_scope,
-                    db=db
-                )
-                
-                # Apply the LLM-enhanced filter to hospital data
-                filtered_hospital_data = await min_necessary_filter.extract(message, hospital_data)
+                    data_accessed.append("patient_data")
                 
-                data["hospital_data"] = filtered_hospital_data
-                data_accessed.append("hospital_data")
-        
-        if "explanation" in query_types:
-            # For explanation queries, use RAG to retrieve relevant information
-            rag_results = await self.rag_pipeline.query(message)
-            data["rag_results"] = rag_results
-            data_accessed.append("medical_knowledge")
-        
-        if "analytics" in query_types:
-            # For analytics queries, retrieve aggregated data
-            if user.role == "hospital" and data_scope.can_access_analytics:
-                analytics_data = await self._get_analytics(
-                    hospital_id=data_scope.hospital_ids[0] if data_scope.hospital_ids else None,
-                    message=message,
-                    data_scope=data_scope,
-                    db=db
-                )
-                
-                # Apply the LLM-enhanced filter to analytics data
-                filtered_analytics = await min_necessary_filter.extract(message, analytics_data)
+                elif user.role == "doctor":
+                    # Doctor can access data for patients they have treated
+                    # First, extract patient name or ID from the message
+                    if patient_id is None:
+                        patient_id = await self._extract_patient_id(message, data_scope.patient_ids, db)
+                    
+                    if patient_id and patient_id in data_scope.patient_id_set:
+                        patient_data = await self._get_patient_data(
+                            patient_id=patient_id,
+                            message=message,
+                            data_scope=data_scope,
+                            db=db
+                        )
+                        
+                        # Get all available data first
+                        all_patient_data = patient_data.get("data", {})
+                        
+                        # Apply the LLM-enhanced filter
+                        filtered_data = await min_necessary_filter.extract(message, all_patient_data)
+                        
+                        # Update the patient_data with filtered data
+                        patient_data["data"] = filtered_data
+                        
+                        data["patient_data"] = patient_data
+                        data_accessed.append(f"patient_data:{patient_id}")
                 
-                data["analytics"] = filtered_analytics
-                data_accessed.append("analytics")
-        
-        if "recommendation" in query_types:
-            # For recommendation queries, we'll include both patient data and medical knowledge
-            # This ensures the LLM has context for making recommendations
-            if "rag_results" not in data:
-                rag_results = await self.rag_pipeline.query(message)
+                elif user.role == "hospital":
+                    # Hospital admin can access aggregated data
+                    hospital_data = await self._get_hospital_data(
+                        hospital_id=data_scope.hospital_ids[0] if data_scope.hospital_ids else None,
+                        message=message,
+                        data_scope=data_scope,
+                        db=db
+                    )
+                    
+                    # Apply the LLM-enhanced filter to hospital data
+                    filtered_hospital_data = await min_necessary_filter.extract(message, hospital_data)
+                    
+                    data["hospital_data"] = filtered_hospital_data
+                    data_accessed.append("hospital_data")
+            
+            if "explanation" in query_types:
+                # For explanation queries, use RAG to retrieve relevant information
+                rag_results = await rag_task
                 data["rag_results"] = rag_results
                 data_accessed.append("medical_knowledge")
             
-            # Add recommendation context
-            data["recommendation_context"] = {
-                "query": message,
-                "recommendation_requested": True
-            }
-            data_accessed.append("recommendation_context")
-        
-        if "action" in query_types:
-            # For action queries, we'll include action context
-            data["action_context"] = {
-                "query": message,
-                "action_requested": True,
-                "available_actions": ["schedule_appointment", "medication_refill", "message_provider"]
-            }
-            data_accessed.append("action_context")
+            if "analytics" in query_types:
+                # For analytics queries, retrieve aggregated data
+                if user.role == "hospital" and data_scope.can_access_analytics:
+                    analytics_data = await self._get_analytics(
+                        hospital_id=data_scope.hospital_ids[0] if data_scope.hospital_ids else None,
+                        message=message,
+                        data_scope=data_scope,
+                        db=db
+                    )
+                    
+                    # Apply the LLM-enhanced filter to analytics data
+                    filtered_analytics = await min_necessary_filter.extract(message, analytics_data)
+                    
+                    data["analytics"] = filtered_analytics
+                    data_accessed.append("analytics")
+            
+            if "recommendation" in query_types:
+                # For recommendation queries, we'll include both patient data and medical knowledge
+                # This ensures the LLM has context for making recommendations
+                if "rag_results" not in data:
+                    rag_results = await rag_task
+                    data["rag_results"] = rag_results
+                    data_accessed.append("medical_knowledge")
+                
+                # Add recommendation context
+                data["recommendation_context"] = {
+                    "query": message,
+                    "recommendation_requested": True
+                }
+                data_accessed.append("recommendation_context")
+            
+            if "action" in query_types:
+                # For action queries, we'll include action context
+                data["action_context"] = {
+                    "query": message,
+                    "action_requested": True,
+                    "available_actions": ["schedule_appointment", "medication_refill", "message_provider"]
+                }
+                data_accessed.append("action_context")
+            
+        finally:
+            if rag_task is not None and not rag_task.done():
+                rag_task.cancel()
         
-        logger.info(f"Retrieved data for query types {query_types}: {list(data.keys())}")
+        logger.info("Retrieved data for query types %s: %s", query_types, list(data))
         
         # Ensure data_accessed is always a list before returning
         if not isinstance(data_accessed, list):
@@ -396,6 +1148,35 @@ class ChatOrchestrator:
                 
         return data, data_accessed
     
+    async def _query_knowledge(self, user: User, message: str) -> List[Dict[str, Any]]:
+        """
+        Query the RAG pipeline, reusing results for semantically equivalent questions.
+        
+        Args:
+            user: The user making the request.
+            message: The user's message.
+            
+        Returns:
+            The RAG results.
+        """
+        router = get_query_router()
+        if router is None:
+            return await self.rag_pipeline.query(message)
+        
+        query_vector = await asyncio.to_thread(router.embed, message)
+        rag_results = rag_cache.get(user.role, query_vector)
+        if rag_results is not None:
+            logger.info("Using semantically cached RAG results")
+            return rag_results
+        
+        rag_results = await self.rag_pipeline.query(message)
+        
+        # Don't cache the knowledge-base-unavailable fallbacks
+        if not any((result.get("metadata") or {}).get("topic") == "error" for result in rag_results):
+            rag_cache.put(user.role, query_vector, rag_results)
+        
+        return rag_results
+    
     async def _get_wearable_data(
         self,
         patient_id: Optional[int],
@@ -433,7 +1214,7 @@ class ChatOrchestrator:
         
         # Extract date information from the message
         query_date = self._extract_date_from_message(message_l)
-        logger.info(f"Extracted date from message: {query_date}")
+        logger.info("Extracted date from message: %s", query_date)
         
         # Initialize wearable data container
         wearable_data = {
@@ -459,7 +1240,7 @@ class ChatOrchestrator:
                         wearable_data["query_date"] = query_date.isoformat()
                         
                         # Log the specific date data for debugging
-                        logger.info(f"Retrieved specific date data for {query_date}: {daily_data[0]}")
+                        logger.debug("Retrieved specific date data for %s: %s", query_date, daily_data[0])
                     else:
                         # If no daily aggregate found, try to get history data for that date
                         start_datetime = datetime.combine(query_date, datetime.min.time())
@@ -477,7 +1258,7 @@ class ChatOrchestrator:
                             wearable_data["query_date"] = query_date.isoformat()
                             
                             # Log the history data for debugging
-                            logger.info(f"Retrieved history data for {query_date}: {history_data[0]}")
+                            logger.debug("Retrieved history data for %s: %s", query_date, history_data[0])
                         else:
                             error_msg = f"No data found for {query_date.strftime('%B %d, %Y')}"
                             logger.warning(f"No data found for date {query_date} for patient {patient_id}")
@@ -499,7 +1280,7 @@ class ChatOrchestrator:
                         wearable_data["data_types"].append("latest")
                         
                         # Log the latest data for debugging
-                        logger.info(f"Retrieved latest vitals data: {latest}")
+                        logger.debug("Retrieved latest vitals data: %s", latest)
                     else:
                         error_msg = latest.get('error', 'Unknown error')
                         logger.warning(f"Could not get latest vitals: {error_msg}")
@@ -536,7 +1317,7 @@ class ChatOrchestrator:
                         wearable_data["data_types"].append("daily")
                         
                         # Log the daily data for debugging
-                        logger.info(f"Retrieved daily vitals data: {daily_data[:2]}...")  # Log first 2 items to avoid excessive logging
+                        logger.debug("Retrieved daily vitals data: %s...", daily_data[:2])  # Log first 2 items to avoid excessive logging
                     else:
                         logger.warning(f"No daily aggregates found for patient {patient_id}")
                 except Exception as e:
@@ -593,10 +1374,9 @@ class ChatOrchestrator:
                         wearable_data["data_types"].append("trends")
                         
                         # Log the trend data for debugging
-                        logger.info(f"Created trend data for {trend_type}: {trend}")
+                        logger.debug("Created trend data for %s: %s", trend_type, trend)
                     else:
                         logger.warning(f"No trend data found for patient {patient_id}")
-                        logger.warning(f"No trend data found for patient {patient_id}")
                 except Exception as e:
                     logger.error(f"Error getting trend data: {str(e)}")
                 
@@ -606,7 +1386,10 @@ class ChatOrchestrator:
                 wearable_data["data_types"].append("summary")
             
             # Log the final wearable data structure
-            logger.info(f"Final wearable data structure: data_types={wearable_data['data_types']}, keys={list(wearable_data['data'].keys())}")
+            logger.info(
+                "Final wearable data structure: data_types=%s, keys=%s",
+                wearable_data['data_types'], list(wearable_data['data'])
+            )
                 
             return wearable_data
             
@@ -624,38 +1407,13 @@ class ChatOrchestrator:
         """
         # Try to extract date using dateparser
         try:
-            # Common date patterns in queries
-            date_patterns = [
-                # Patterns with spaces between day and month
-                r'on\s+(\d{1,2}(?:st|nd|rd|th)?\s+(?:of\s+)?(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\s+\d{4})',
-                r'on\s+(\d{1,2}(?:st|nd|rd|th)?\s+(?:of\s+)?(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?))',
-                r'on\s+(\d{4}-\d{1,2}-\d{1,2})',
-                r'on\s+(\d{1,2}/\d{1,2}/\d{2,4})',
-                r'on\s+(\d{1,2}-\d{1,2}-\d{2,4})',
-                r'for\s+(\d{1,2}(?:st|nd|rd|th)?\s+(?:of\s+)?(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\s+\d{4})',
-                r'for\s+(\d{1,2}(?:st|nd|rd|th)?\s+(?:of\s+)?(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?))',
-                r'for\s+(\d{4}-\d{1,2}-\d{1,2})',
-                r'for\s+(\d{1,2}/\d{1,2}/\d{2,4})',
-                r'for\s+(\d{1,2}-\d{1,2}-\d{2,4})',
-                r'(\d{1,2}(?:st|nd|rd|th)?\s+(?:of\s+)?(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\s+\d{4})',
-                r'(\d{1,2}(?:st|nd|rd|th)?\s+(?:of\s+)?(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?))',
-                r'(\d{4}-\d{1,2}-\d{1,2})',
-                r'(\d{1,2}/\d{1,2}/\d{2,4})',
-                r'(\d{1,2}-\d{1,2}-\d{2,4})',
-                
-                # Patterns without spaces between day and month (e.g., "25december2025")
-                r'(\d{1,2}(?:st|nd|rd|th)?(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\d{4})',
-                r'(\d{1,2}(?:st|nd|rd|th)?(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\d{2})',
-                r'on\s+(\d{1,2}(?:st|nd|rd|th)?(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\d{4})',
-                r'for\s+(\d{1,2}(?:st|nd|rd|th)?(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\d{4})'
-            ]
-            
-            # Try to match date patterns
+            # Try to match date patterns, in priority order
+            date_patterns = DATE_PATTERNS if DIGIT_RE.search(message) else ()
             for pattern in date_patterns:
-                match = re.search(pattern, message)
+                match = pattern.search(message)
                 if match:
                     date_str = match.group(1)
-                    logging.info(f"Found date pattern match: '{date_str}' using pattern '{pattern}'")
+                    logging.info(f"Found date pattern match: '{date_str}' using pattern '{pattern.pattern}'")
                     parsed_date = dateparser.parse(date_str)
                     if parsed_date:
                         logging.info(f"Successfully parsed date '{date_str}' to {parsed_date.date()}")
@@ -715,7 +1473,7 @@ class ChatOrchestrator:
             Patient data.
         """
         from sqlalchemy import select
-        from app.models import Patient, Medication, Vitals, Appointment, CarePlan, LabResult, LabOrder
+        from app.models import Patient
         
         # 1️⃣ Validate patient_id
         if not patient_id:
@@ -723,15 +1481,15 @@ class ChatOrchestrator:
 
         # 2️⃣ Verify patient exists
         result = await db.execute(
-            select(Patient).where(Patient.id == patient_id)
+            select(Patient.first_name, Patient.last_name).where(Patient.id == patient_id)
         )
-        patient = result.scalar_one_or_none()
+        patient = result.one_or_none()
 
         if not patient:
             return {"error": "Patient not found"}
 
         # 3️⃣ RBAC enforcement (defense in depth)
-        if patient_id not in data_scope.patient_ids:
+        if patient_id not in data_scope.patient_id_set:
             return {"error": "Access denied"}
 
         # 4️⃣ Consent check (ROLE AWARE)
@@ -745,7 +1503,7 @@ class ChatOrchestrator:
 
         if "lab" in message_l:
             data_types.append("labs")
-        if "medication" in message_l or "med" in message_l:
+        if "med" in message_l:  # also covers "medication"
             data_types.append("medications")
         if "vital" in message_l:
             data_types.append("vitals")
@@ -771,83 +1529,18 @@ class ChatOrchestrator:
         }
 
         # 7️⃣ Fetch data (minimum necessary)
-        for data_type in allowed_data_types:
-
-            if data_type == "medications":
-                result = await db.execute(
-                    select(Medication).where(Medication.patient_id == patient_id)
-                )
-                patient_data["data"]["medications"] = [
-                    {
-                        "name": med.medication_name,
-                        "dosage": med.dosage,
-                        "frequency": med.frequency,
-                        "status": med.status
-                    }
-                    for med in result.scalars().all()
-                ]
-
-            elif data_type == "vitals":
-                result = await db.execute(
-                    select(Vitals)
-                    .where(Vitals.patient_id == patient_id)
-                    .order_by(Vitals.recorded_at.desc())
-                )
-                patient_data["data"]["vitals"] = [
-                    {
-                        "date": vital.recorded_at.isoformat() if vital.recorded_at else None,
-                        "blood_pressure": vital.blood_pressure,
-                        "heart_rate": vital.heart_rate,
-                        "bmi": float(vital.bmi) if vital.bmi else None
-                    }
-                    for vital in result.scalars().all()
-                ]
-
-            elif data_type == "appointments":
-                result = await db.execute(
-                    select(Appointment).where(Appointment.patient_id == patient_id)
-                )
-                patient_data["data"]["appointments"] = [
-                    {
-                        "date": appt.appointment_date.isoformat() if appt.appointment_date else None,
-                        "status": appt.status,
-                        "mode": appt.mode
-                    }
-                    for appt in result.scalars().all()
-                ]
-
-            elif data_type == "care_plans":
-                result = await db.execute(
-                    select(CarePlan).where(CarePlan.patient_id == patient_id)
-                )
-                patient_data["data"]["care_plans"] = [
-                    {
-                        "status": cp.status,
-                        "summary": cp.patient_friendly_summary
-                    }
-                    for cp in result.scalars().all()
-                ]
-
-            elif data_type == "labs":
-                result = await db.execute(
-                    select(LabOrder).where(LabOrder.patient_id == patient_id)
-                )
-
-                labs = []
-                for order in result.scalars().all():
-                    res = await db.execute(
-                        select(LabResult).where(LabResult.lab_order_id == order.id)
-                    )
-                    labs.append({
-                        "test": order.test_name,
-                        "status": order.status,
-                        "results": [
-                            {"value": r.result_value}
-                            for r in res.scalars().all()
-                        ]
-                    })
+        if len(allowed_data_types) == 1:
+            fetched = [await self._fetch_patient_rows(allowed_data_types[0], patient_id, db)]
+        else:
+            # An AsyncSession can't run queries concurrently, so each type gets its own
+            fetched = await asyncio.gather(*(
+                self._fetch_patient_rows_in_session(data_type, patient_id)
+                for data_type in allowed_data_types
+            ))
+        for key, rows in fetched:
+            if key is not None:
+                patient_data["data"][key] = rows
 
-                patient_data["data"]["labs"] = labs
         # Check if wearable data is requested
         if any(term in message_l for term in ["wearable", "watch", "device", "monitor", "heart rate", "temperature", "blood pressure", "bp", "oxygen"]):
             wearable_data = await self._get_wearable_data(patient_id, message, data_scope, db)
@@ -864,7 +1557,7 @@ class ChatOrchestrator:
                     # Check for specific date data first
                     if "specific_date" in wearable_data["data"]:
                         specific_data = wearable_data["data"]["specific_date"]
-                        logger.info(f"Checking specific_data for blood pressure: {specific_data}")
+                        logger.debug("Checking specific_data for blood pressure: %s", specific_data)
                         
                         # Check if there's an error in the specific_data
                         if "error" in specific_data:
@@ -889,7 +1582,7 @@ class ChatOrchestrator:
                                 },
                                 "date": specific_data.get("date", wearable_data.get("query_date", "recent date"))
                             }
-                            logger.info(f"Added blood pressure data from specific date: {patient_data['data']['blood_pressure']}")
+                            logger.debug("Added blood pressure data from specific date: %s", patient_data['data']['blood_pressure'])
                         # Check for older format with systolic_bp and diastolic_bp
                         elif "systolic_bp" in specific_data and "diastolic_bp" in specific_data:
                             patient_data["data"]["blood_pressure"] = {
@@ -897,11 +1590,11 @@ class ChatOrchestrator:
                                 "diastolic": specific_data["diastolic_bp"],
                                 "date": wearable_data.get("query_date", "recent date")
                             }
-                            logger.info(f"Added blood pressure data from specific date (old format): {patient_data['data']['blood_pressure']}")
+                            logger.debug("Added blood pressure data from specific date (old format): %s", patient_data['data']['blood_pressure'])
                     # If no specific date data, check latest
                     elif "latest" in wearable_data["data"]:
                         latest_data = wearable_data["data"]["latest"]
-                        logger.info(f"Checking latest_data for blood pressure: {latest_data}")
+                        logger.debug("Checking latest_data for blood pressure: %s", latest_data)
                         
                         # Check if there's an error in the latest_data
                         if "error" in latest_data:
@@ -926,7 +1619,7 @@ class ChatOrchestrator:
                                 },
                                 "date": latest_data.get("date", "latest reading")
                             }
-                            logger.info(f"Added latest blood pressure data: {patient_data['data']['blood_pressure']}")
+                            logger.debug("Added latest blood pressure data: %s", patient_data['data']['blood_pressure'])
                         # Check for older format with systolic_bp and diastolic_bp
                         elif "systolic_bp" in latest_data and "diastolic_bp" in latest_data:
                             patient_data["data"]["blood_pressure"] = {
@@ -934,13 +1627,13 @@ class ChatOrchestrator:
                                 "diastolic": latest_data["diastolic_bp"],
                                 "date": "latest reading"
                             }
-                            logger.info(f"Added latest blood pressure data (old format): {patient_data['data']['blood_pressure']}")
+                            logger.debug("Added latest blood pressure data (old format): %s", patient_data['data']['blood_pressure'])
                 
                 # Process heart rate data if requested
                 if "heart rate" in message_l or "pulse" in message_l:
                     if "specific_date" in wearable_data["data"]:
                         specific_data = wearable_data["data"]["specific_date"]
-                        logger.info(f"Checking specific_data for heart rate: {specific_data}")
+                        logger.debug("Checking specific_data for heart rate: %s", specific_data)
                         
                         # Check if there's an error in the specific_data
                         if "error" in specific_data:
@@ -958,17 +1651,17 @@ class ChatOrchestrator:
                                     "low": hr_data["low"],
                                     "date": specific_data.get("date", wearable_data.get("query_date", "recent date"))
                                 }
-                                logger.info(f"Added heart rate data from specific date: {patient_data['data']['heart_rate']}")
+                                logger.debug("Added heart rate data from specific date: %s", patient_data['data']['heart_rate'])
                             # Check if heart_rate is a simple value
                             else:
                                 patient_data["data"]["heart_rate"] = {
                                     "value": hr_data,
                                     "date": specific_data.get("date", wearable_data.get("query_date", "recent date"))
                                 }
-                                logger.info(f"Added heart rate data from specific date (simple value): {patient_data['data']['heart_rate']}")
+                                logger.debug("Added heart rate data from specific date (simple value): %s", patient_data['data']['heart_rate'])
                     elif "latest" in wearable_data["data"]:
                         latest_data = wearable_data["data"]["latest"]
-                        logger.info(f"Checking latest_data for heart rate: {latest_data}")
+                        logger.debug("Checking latest_data for heart rate: %s", latest_data)
                         
                         # Check if there's an error in the latest_data
                         if "error" in latest_data:
@@ -986,20 +1679,20 @@ class ChatOrchestrator:
                                     "low": hr_data["low"],
                                     "date": latest_data.get("date", "latest reading")
                                 }
-                                logger.info(f"Added latest heart rate data: {patient_data['data']['heart_rate']}")
+                                logger.debug("Added latest heart rate data: %s", patient_data['data']['heart_rate'])
                             # Check if heart_rate is a simple value
                             else:
                                 patient_data["data"]["heart_rate"] = {
                                     "value": hr_data,
                                     "date": latest_data.get("date", "latest reading")
                                 }
-                                logger.info(f"Added latest heart rate data (simple value): {patient_data['data']['heart_rate']}")
+                                logger.debug("Added latest heart rate data (simple value): %s", patient_data['data']['heart_rate'])
                 
                 # Process temperature data if requested
                 if "temperature" in message_l or "temp" in message_l:
                     if "specific_date" in wearable_data["data"]:
                         specific_data = wearable_data["data"]["specific_date"]
-                        logger.info(f"Checking specific_data for temperature: {specific_data}")
+                        logger.debug("Checking specific_data for temperature: %s", specific_data)
                         
                         # Check if there's an error in the specific_data
                         if "error" in specific_data:
@@ -1017,17 +1710,17 @@ class ChatOrchestrator:
                                     "low": temp_data["low"],
                                     "date": specific_data.get("date", wearable_data.get("query_date", "recent date"))
                                 }
-                                logger.info(f"Added temperature data from specific date: {patient_data['data']['temperature']}")
+                                logger.debug("Added temperature data from specific date: %s", patient_data['data']['temperature'])
                             # Check if temperature is a simple value
                             else:
                                 patient_data["data"]["temperature"] = {
                                     "value": temp_data,
                                     "date": specific_data.get("date", wearable_data.get("query_date", "recent date"))
                                 }
-                                logger.info(f"Added temperature data from specific date (simple value): {patient_data['data']['temperature']}")
+                                logger.debug("Added temperature data from specific date (simple value): %s", patient_data['data']['temperature'])
                     elif "latest" in wearable_data["data"]:
                         latest_data = wearable_data["data"]["latest"]
-                        logger.info(f"Checking latest_data for temperature: {latest_data}")
+                        logger.debug("Checking latest_data for temperature: %s", latest_data)
                         
                         # Check if there's an error in the latest_data
                         if "error" in latest_data:
@@ -1045,20 +1738,20 @@ class ChatOrchestrator:
                                     "low": temp_data["low"],
                                     "date": latest_data.get("date", "latest reading")
                                 }
-                                logger.info(f"Added latest temperature data: {patient_data['data']['temperature']}")
+                                logger.debug("Added latest temperature data: %s", patient_data['data']['temperature'])
                             # Check if temperature is a simple value
                             else:
                                 patient_data["data"]["temperature"] = {
                                     "value": temp_data,
                                     "date": latest_data.get("date", "latest reading")
                                 }
-                                logger.info(f"Added latest temperature data (simple value): {patient_data['data']['temperature']}")
+                                logger.debug("Added latest temperature data (simple value): %s", patient_data['data']['temperature'])
                 
                 # Process oxygen level data if requested
                 if "oxygen" in message_l or "o2" in message_l:
                     if "specific_date" in wearable_data["data"]:
                         specific_data = wearable_data["data"]["specific_date"]
-                        logger.info(f"Checking specific_data for oxygen level: {specific_data}")
+                        logger.debug("Checking specific_data for oxygen level: %s", specific_data)
                         
                         # Check if there's an error in the specific_data
                         if "error" in specific_data:
@@ -1076,17 +1769,17 @@ class ChatOrchestrator:
                                     "low": o2_data["low"],
                                     "date": specific_data.get("date", wearable_data.get("query_date", "recent date"))
                                 }
-                                logger.info(f"Added oxygen level data from specific date: {patient_data['data']['oxygen_level']}")
+                                logger.debug("Added oxygen level data from specific date: %s", patient_data['data']['oxygen_level'])
                             # Check if oxygen_level is a simple value
                             else:
                                 patient_data["data"]["oxygen_level"] = {
                                     "value": o2_data,
                                     "date": specific_data.get("date", wearable_data.get("query_date", "recent date"))
                                 }
-                                logger.info(f"Added oxygen level data from specific date (simple value): {patient_data['data']['oxygen_level']}")
+                                logger.debug("Added oxygen level data from specific date (simple value): %s", patient_data['data']['oxygen_level'])
                     elif "latest" in wearable_data["data"]:
                         latest_data = wearable_data["data"]["latest"]
-                        logger.info(f"Checking latest_data for oxygen level: {latest_data}")
+                        logger.debug("Checking latest_data for oxygen level: %s", latest_data)
                         
                         # Check if there's an error in the latest_data
                         if "error" in latest_data:
@@ -1104,18 +1797,160 @@ class ChatOrchestrator:
                                     "low": o2_data["low"],
                                     "date": latest_data.get("date", "latest reading")
                                 }
-                                logger.info(f"Added latest oxygen level data: {patient_data['data']['oxygen_level']}")
+                                logger.debug("Added latest oxygen level data: %s", patient_data['data']['oxygen_level'])
                             # Check if oxygen_level is a simple value
                             else:
                                 patient_data["data"]["oxygen_level"] = {
                                     "value": o2_data,
                                     "date": latest_data.get("date", "latest reading")
                                 }
-                                logger.info(f"Added latest oxygen level data (simple value): {patient_data['data']['oxygen_level']}")
+                                logger.debug("Added latest oxygen level data (simple value): %s", patient_data['data']['oxygen_level'])
 
         return patient_data
 
     
+    async def _fetch_patient_rows_in_session(
+        self,
+        data_type: str,
+        patient_id: int
+    ) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """
+        Fetch one patient data type using a dedicated database session.
+        
+        Args:
+            data_type: The data type to fetch.
+            patient_id: The patient ID.
+            
+        Returns:
+            The data key and its rows.
+        """
+        from app.database import AsyncSessionLocal
+        
+        async with AsyncSessionLocal() as session:
+            return await self._fetch_patient_rows(data_type, patient_id, session)
+    
+    async def _fetch_patient_rows(
+        self,
+        data_type: str,
+        patient_id: int,
+        db: AsyncSession
+    ) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """
+        Fetch the rows for one patient data type.
+        
+        Args:
+            data_type: The data type to fetch.
+            patient_id: The patient ID.
+            db: The database session.
+            
+        Returns:
+            The data key and its rows, or (None, []) for an unknown data type.
+        """
+        from sqlalchemy import select
+        from app.models import Medication, Vitals, Appointment, CarePlan, LabOrder, LabResult
+        
+        # Each query selects only the columns its dicts use, so no ORM objects are built
+        if data_type == "medications":
+            result = await db.execute(
+                select(
+                    Medication.medication_name,
+                    Medication.dosage,
+                    Medication.frequency,
+                    Medication.status
+                ).where(Medication.patient_id == patient_id)
+            )
+            return "medications", [
+                {
+                    "name": med.medication_name,
+                    "dosage": med.dosage,
+                    "frequency": med.frequency,
+                    "status": med.status
+                }
+                for med in result.all()
+            ]
+        
+        if data_type == "vitals":
+            result = await db.execute(
+                select(
+                    Vitals.recorded_at,
+                    Vitals.blood_pressure,
+                    Vitals.heart_rate,
+                    Vitals.bmi
+                )
+                .where(Vitals.patient_id == patient_id)
+                .order_by(Vitals.recorded_at.desc())
+            )
+            return "vitals", [
+                {
+                    "date": vital.recorded_at.isoformat() if vital.recorded_at else None,
+                    "blood_pressure": vital.blood_pressure,
+                    "heart_rate": vital.heart_rate,
+                    "bmi": float(vital.bmi) if vital.bmi else None
+                }
+                for vital in result.all()
+            ]
+        
+        if data_type == "appointments":
+            result = await db.execute(
+                select(
+                    Appointment.appointment_date,
+                    Appointment.status,
+                    Appointment.mode
+                ).where(Appointment.patient_id == patient_id)
+            )
+            return "appointments", [
+                {
+                    "date": appt.appointment_date.isoformat() if appt.appointment_date else None,
+                    "status": appt.status,
+                    "mode": appt.mode
+                }
+                for appt in result.all()
+            ]
+        
+        if data_type == "care_plans":
+            result = await db.execute(
+                select(
+                    CarePlan.status,
+                    CarePlan.patient_friendly_summary
+                ).where(CarePlan.patient_id == patient_id)
+            )
+            return "care_plans", [
+                {
+                    "status": cp.status,
+                    "summary": cp.patient_friendly_summary
+                }
+                for cp in result.all()
+            ]
+        
+        if data_type == "labs":
+            # Orders and their results in one query, grouped per order
+            result = await db.execute(
+                select(
+                    LabOrder.id,
+                    LabOrder.test_name,
+                    LabOrder.status,
+                    LabResult.id.label("result_id"),
+                    LabResult.result_value
+                )
+                .outerjoin(LabResult, LabResult.lab_order_id == LabOrder.id)
+                .where(LabOrder.patient_id == patient_id)
+            )
+            labs: Dict[int, Dict[str, Any]] = {}
+            for row in result.all():
+                lab = labs.get(row.id)
+                if lab is None:
+                    lab = labs[row.id] = {
+                        "test": row.test_name,
+                        "status": row.status,
+                        "results": []
+                    }
+                # Orders without results come back once with NULL result columns
+                if row.result_id is not None:
+                    lab["results"].append({"value": row.result_value})
+            return "labs", list(labs.values())
+        
+        return None, []
+    
     async def _get_hospital_data(
         self,
         hospital_id: Optional[int],
@@ -1132,6 +1967,23 @@ class ChatOrchestrator:
             data_scope: The user's data scope.
             db: The database session.
             
+        Returns:
+            Hospital data.
+        """
+        return await self._get_cached_aggregate(
+            self._hospital_cache,
+            ("hospital", hospital_id, date.today()),
+            lambda: self._query_hospital_data(hospital_id, db)
+        )
+    
+    async def _query_hospital_data(self, hospital_id: Optional[int], db: AsyncSession) -> Dict[str, Any]:
+        """
+        Query hospital info and counts from the database.
+        
+        Args:
+            hospital_id: The hospital ID.
+            db: The database session.
+            
         Returns:
             Hospital data.
         """
@@ -1141,49 +1993,63 @@ class ChatOrchestrator:
         if not hospital_id:
             return {"error": "No hospital ID provided"}
         
-        # Get hospital basic info
-        result = await db.execute(
-            select(Hospital).where(Hospital.id == hospital_id)
-        )
-        hospital = result.scalar_one_or_none()
-        
-        if not hospital:
-            return {"error": f"Hospital with ID {hospital_id} not found"}
-        
         # Count patients in this hospital
-        result = await db.execute(
+        patient_count = (
             select(func.count(Patient.id))
             .join(User, User.id == Patient.user_id)
             .where(User.hospital_id == hospital_id)
+            .scalar_subquery()
         )
-        patient_count = result.scalar_one_or_none() or 0
         
         # Count doctors in this hospital
-        result = await db.execute(
-            select(func.count(Doctor.id)).where(Doctor.hospital_id == hospital_id)
+        doctor_count = (
+            select(func.count(Doctor.id))
+            .where(Doctor.hospital_id == hospital_id)
+            .scalar_subquery()
         )
-        doctor_count = result.scalar_one_or_none() or 0
         
         # Count appointments in this hospital
+        appointment_count = (
+            select(func.count(Appointment.id))
+            .where(Appointment.hospital_id == hospital_id)
+            .scalar_subquery()
+        )
+        
+        # Get hospital basic info and all counts in one round trip
         result = await db.execute(
-            select(func.count(Appointment.id)).where(Appointment.hospital_id == hospital_id)
+            select(
+                Hospital.name,
+                Hospital.email,
+                Hospital.phone,
+                Hospital.address,
+                Hospital.city,
+                Hospital.state,
+                Hospital.zip_code,
+                Hospital.country,
+                patient_count.label("patient_count"),
+                doctor_count.label("doctor_count"),
+                appointment_count.label("appointment_count")
+            ).where(Hospital.id == hospital_id)
         )
-        appointment_count = result.scalar_one_or_none() or 0
+        row = result.one_or_none()
+        
+        if not row:
+            return {"error": f"Hospital with ID {hospital_id} not found"}
         
         # Return hospital data
         hospital_data = {
             "hospital_id": hospital_id,
-            "name": hospital.name,
-            "email": hospital.email,
-            "phone": hospital.phone,
-            "address": hospital.address,
-            "city": hospital.city,
-            "state": hospital.state,
-            "zip_code": hospital.zip_code,
-            "country": hospital.country,
-            "patient_count": patient_count,
-            "doctor_count": doctor_count,
-            "appointment_count": appointment_count
+            "name": row.name,
+            "email": row.email,
+            "phone": row.phone,
+            "address": row.address,
+            "city": row.city,
+            "state": row.state,
+            "zip_code": row.zip_code,
+            "country": row.country,
+            "patient_count": row.patient_count or 0,
+            "doctor_count": row.doctor_count or 0,
+            "appointment_count": row.appointment_count or 0
         }
         
         return hospital_data
@@ -1196,18 +2062,71 @@ class ChatOrchestrator:
         db: AsyncSession
     ) -> Dict[str, Any]:
         """
-        Get analytics data based on the message and data scope.
+        Get analytics data based on the message and data scope.
+        
+        Args:
+            hospital_id: The hospital ID.
+            message: The user's message.
+            data_scope: The user's data scope.
+            db: The database session.
+            
+        Returns:
+            Analytics data.
+        """
+        return await self._get_cached_aggregate(
+            self._analytics_cache,
+            ("analytics", hospital_id, date.today()),
+            lambda: self._query_analytics(hospital_id, db)
+        )
+    
+    async def _get_cached_aggregate(
+        self,
+        cache: ResponseCache,
+        key: Tuple[str, int, date],
+        query: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Serve a hospital aggregate from cache, querying it at most once per key
+        when concurrent requests miss together.
+        
+        Args:
+            cache: The cache for this kind of aggregate.
+            key: The cache key.
+            query: Runs the database query on a miss.
+            
+        Returns:
+            The aggregate.
+        """
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        
+        lock = self._aggregate_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            cached = cache.get(key)
+            if cached is None:
+                cached = await query()
+                # Errors (missing hospital, no ID) are cheap and shouldn't stick
+                if "error" not in cached:
+                    cache.put(key, cached)
+        
+        if not lock.locked():
+            self._aggregate_locks.pop(key, None)
+        return cached
+    
+    async def _query_analytics(self, hospital_id: Optional[int], db: AsyncSession) -> Dict[str, Any]:
+        """
+        Query patient demographics, appointment and encounter stats from the database.
         
         Args:
             hospital_id: The hospital ID.
-            message: The user's message.
-            data_scope: The user's data scope.
             db: The database session.
             
         Returns:
             Analytics data.
         """
-        from sqlalchemy import select, func, case
+        from sqlalchemy import select, func
+        from sqlalchemy.dialects.postgresql import array
         from app.models import Patient, Appointment, Encounter, Doctor, User
         from datetime import datetime, timedelta
         
@@ -1223,36 +2142,39 @@ class ChatOrchestrator:
         }
         
         # Get patient demographics
-        # Age groups
-        result = await db.execute(
+        # Age groups and gender distribution in one query, grouped by each separately.
+        # Ages are bucketed to integers in SQL; NULL ages count as "65+" like the oldest bucket
+        patients = (
             select(
-                case(
-                    (Patient.age <= 18, "0-18"),
-                    (Patient.age <= 35, "19-35"),
-                    (Patient.age <= 50, "36-50"),
-                    (Patient.age <= 65, "51-65"),
-                    else_="65+"
-                ).label("age_group"),
-                func.count(Patient.id)
+                func.coalesce(
+                    func.width_bucket(Patient.age, array(AGE_GROUP_BOUNDS)),
+                    len(AGE_GROUP_BOUNDS)
+                ).label("age_bucket"),
+                Patient.gender,
+                Patient.id
             )
             .join(User, User.id == Patient.user_id)
             .where(User.hospital_id == hospital_id)
-            .group_by("age_group")
+            .subquery()
         )
-        age_groups = {row[0]: row[1] for row in result.all()}
-        analytics_data["patient_demographics"]["age_groups"] = age_groups
-        
-        # Gender distribution
         result = await db.execute(
             select(
-                Patient.gender,
-                func.count(Patient.id)
+                patients.c.age_bucket,
+                patients.c.gender,
+                func.count(patients.c.id),
+                # 1 on age group rows (gender rolled up), 0 on gender rows
+                func.grouping(patients.c.gender)
             )
-            .join(User, User.id == Patient.user_id)
-            .where(User.hospital_id == hospital_id)
-            .group_by(Patient.gender)
+            .group_by(func.grouping_sets(patients.c.age_bucket, patients.c.gender))
         )
-        gender_distribution = {row[0]: row[1] for row in result.all()}
+        age_groups = {}
+        gender_distribution = {}
+        for age_bucket, gender, count, is_age_row in result.all():
+            if is_age_row:
+                age_groups[AGE_GROUP_LABELS[age_bucket]] = count
+            else:
+                gender_distribution[gender] = count
+        analytics_data["patient_demographics"]["age_groups"] = age_groups
         analytics_data["patient_demographics"]["gender"] = gender_distribution
         
         # Appointment stats
@@ -1262,22 +2184,34 @@ class ChatOrchestrator:
         first_day_of_last_month = first_day_of_month - timedelta(days=1)
         first_day_of_last_month = datetime(first_day_of_last_month.year, first_day_of_last_month.month, 1)
         
-        # This month's appointments
-        result = await db.execute(
-            select(func.count(Appointment.id))
+        # This and last month's appointments plus encounter counts in one round trip
+        appointment_counts = (
+            select(
+                func.count(Appointment.id)
+                .filter(Appointment.appointment_date >= first_day_of_month)
+                .label("this_month"),
+                func.count(Appointment.id)
+                .filter(Appointment.appointment_date >= first_day_of_last_month)
+                .filter(Appointment.appointment_date < first_day_of_month)
+                .label("last_month")
+            )
             .where(Appointment.hospital_id == hospital_id)
-            .where(Appointment.appointment_date >= first_day_of_month)
+            .subquery()
+        )
+        encounter_counts = (
+            select(
+                func.count(Encounter.id).label("encounter_count"),
+                func.count(func.distinct(Encounter.patient_id)).label("patient_count")
+            )
+            .where(Encounter.hospital_id == hospital_id)
+            .subquery()
         )
-        this_month = result.scalar_one_or_none() or 0
-        
-        # Last month's appointments
         result = await db.execute(
-            select(func.count(Appointment.id))
-            .where(Appointment.hospital_id == hospital_id)
-            .where(Appointment.appointment_date >= first_day_of_last_month)
-            .where(Appointment.appointment_date < first_day_of_month)
+            select(appointment_counts, encounter_counts)
         )
-        last_month = result.scalar_one_or_none() or 0
+        row = result.one()
+        this_month = row.this_month or 0
+        last_month = row.last_month or 0
         
         # Calculate change percentage
         change_percent = 0
@@ -1294,17 +2228,8 @@ class ChatOrchestrator:
         # Average length of stay (days between encounters)
         # This is a complex calculation that would require more detailed analysis
         # For now, we'll use a simpler metric: encounters per patient
-        
-        result = await db.execute(
-            select(
-                func.count(Encounter.id).label("encounter_count"),
-                func.count(func.distinct(Encounter.patient_id)).label("patient_count")
-            )
-            .where(Encounter.hospital_id == hospital_id)
-        )
-        row = result.one_or_none()
-        encounter_count = row[0] if row else 0
-        patient_count = row[1] if row else 0
+        encounter_count = row.encounter_count or 0
+        patient_count = row.patient_count or 0
         
         encounters_per_patient = 0
         if patient_count > 0:
@@ -1334,21 +2259,17 @@ class ChatOrchestrator:
         Returns:
             The extracted patient ID, or None if no ID was found.
         """
-        from sqlalchemy import select, or_, and_
-        from app.models import Patient
-        import re
-        
-        # First, check if any patient ID is mentioned directly
-        for patient_id in allowed_patient_ids:
-            if str(patient_id) in message:
-                logger.info(f"Found patient ID {patient_id} directly in message")
+        # First, check if any allowed patient ID is mentioned directly
+        allowed = set(allowed_patient_ids)
+        for match in PATIENT_ID_RE.finditer(message):
+            patient_id = int(match.group(1))
+            if patient_id in allowed:
+                logger.info("Found patient ID %s directly in message", patient_id)
                 return patient_id
         
-        # Get all patients the user can access
-        result = await db.execute(
-            select(Patient).where(Patient.id.in_(allowed_patient_ids))
-        )
-        patients = result.scalars().all()
+        # Names of all patients the user can access
+        index = await self._get_patient_name_index(allowed_patient_ids, db)
+        patients = index.patients
         
         # Extract potential patient names from the message
         # Look for patterns like "patient John Smith" or "for Jane Doe"
@@ -1366,25 +2287,22 @@ class ChatOrchestrator:
         
         # If no specific patterns matched, check for any words that might be names
         if not potential_names:
-            # Split message into words and check each word against patient names
-            words = message.lower().split()
-            for patient in patients:
-                first_name = patient.first_name.lower()
-                last_name = patient.last_name.lower()
-                
-                if first_name in words or last_name in words:
-                    potential_names.append(f"{patient.first_name} {patient.last_name}")
+            for position in self._patients_with_name_tokens(index, message.lower().split()):
+                patient = patients[position]
+                potential_names.append(f"{patient.first_name} {patient.last_name}")
         
-        logger.info(f"Potential patient names extracted from message: {potential_names}")
+        logger.info("Potential patient names extracted from message: %s", potential_names)
         
-        # Match potential names against patient database
+        # Match potential names against the accessible patients
         matched_patients = []
         seen_patient_ids = set()  # To track which patients we've already added
         
         for name in potential_names:
             name_parts = name.lower().split()
             
-            for patient in patients:
+            # Only patients sharing a first or last name with the candidate can match
+            for position in self._patients_with_name_tokens(index, name_parts):
+                patient = patients[position]
                 # Skip if we've already added this patient
                 if patient.id in seen_patient_ids:
                     continue
@@ -1395,17 +2313,19 @@ class ChatOrchestrator:
                 # Check for exact match (first name + last name)
                 if len(name_parts) >= 2 and first_name == name_parts[0] and last_name == name_parts[1]:
                     matched_patients.append((patient, 3))  # High confidence
-                    seen_patient_ids.add(patient.id)
-                # Check for partial match (first name only or last name only)
-                elif first_name in name_parts or last_name in name_parts:
-                    matched_patients.append((patient, 1))  # Low confidence
-                    seen_patient_ids.add(patient.id)
+                else:
+                    matched_patients.append((patient, 1))  # Low confidence (first or last name only)
+                seen_patient_ids.add(patient.id)
         
         # Sort by confidence (highest first)
         matched_patients.sort(key=lambda x: x[1], reverse=True)
         
         # Log the matched patients
-        logger.info(f"Matched patients: {[(p[0].first_name + ' ' + p[0].last_name, p[1]) for p in matched_patients]}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Matched patients: %s",
+                [(p[0].first_name + ' ' + p[0].last_name, p[1]) for p in matched_patients]
+            )
         
         if matched_patients:
             # If we have multiple matches with the same confidence, we need to handle ambiguity
@@ -1415,13 +2335,107 @@ class ChatOrchestrator:
                 return await self._handle_ambiguous_patient_match(matched_patients, message, db)
             else:
                 # Return the highest confidence match
-                logger.info(f"Matched patient name to ID {matched_patients[0][0].id} ({matched_patients[0][0].first_name} {matched_patients[0][0].last_name})")
+                logger.info(
+                    "Matched patient name to ID %s (%s %s)",
+                    matched_patients[0][0].id, matched_patients[0][0].first_name, matched_patients[0][0].last_name
+                )
                 return matched_patients[0][0].id
         
         # If no specific patient is found, return the first allowed ID
-        logger.info(f"No patient name match found, defaulting to first allowed ID: {allowed_patient_ids[0] if allowed_patient_ids else None}")
+        logger.info(
+            "No patient name match found, defaulting to first allowed ID: %s",
+            allowed_patient_ids[0] if allowed_patient_ids else None
+        )
         return allowed_patient_ids[0] if allowed_patient_ids else None
     
+    async def _get_patient_name_index(
+        self,
+        allowed_patient_ids: List[int],
+        db: AsyncSession
+    ) -> PatientNameIndex:
+        """
+        Get the name index for a set of accessible patients, building it on a miss.
+        
+        Args:
+            allowed_patient_ids: The list of patient IDs the user can access.
+            db: The database session.
+            
+        Returns:
+            The patients in database order and their name token positions.
+        """
+        from sqlalchemy import select
+        from app.models import Patient
+        
+        key = tuple(sorted(allowed_patient_ids))
+        cached = self._patient_indexes.get(key)
+        if cached is not None:
+            index, built_at = cached
+            if time.monotonic() - built_at <= self.PATIENT_INDEX_TTL:
+                self._patient_indexes.move_to_end(key)
+                return index
+            del self._patient_indexes[key]
+        
+        result = await db.execute(
+            select(Patient.id, Patient.first_name, Patient.last_name)
+            .where(Patient.id.in_(allowed_patient_ids))
+        )
+        patients = tuple(PatientName(*row) for row in result.all())
+        
+        tokens: Dict[str, List[int]] = {}
+        for position, patient in enumerate(patients):
+            first_name = patient.first_name.lower()
+            last_name = patient.last_name.lower()
+            tokens.setdefault(first_name, []).append(position)
+            if last_name != first_name:
+                tokens.setdefault(last_name, []).append(position)
+        
+        index = PatientNameIndex(
+            patients=patients,
+            tokens={token: tuple(positions) for token, positions in tokens.items()}
+        )
+        self._patient_indexes[key] = (index, time.monotonic())
+        while len(self._patient_indexes) > self.PATIENT_INDEX_CACHE_SIZE:
+            self._patient_indexes.popitem(last=False)
+        return index
+    
+    @staticmethod
+    def _patients_with_name_tokens(index: PatientNameIndex, words: List[str]) -> List[int]:
+        """
+        Find the patients whose first or last name is one of the given words.
+        
+        Args:
+            index: The patient name index.
+            words: Lowercase words to look up.
+            
+        Returns:
+            Matching patient positions, in database order.
+        """
+        positions = set()
+        for word in words:
+            positions.update(index.tokens.get(word, ()))
+        return sorted(positions)
+    
+    async def _prefetch_patient_id(
+        self,
+        message: str,
+        allowed_patient_ids: List[int]
+    ) -> Optional[int]:
+        """
+        Extract the patient ID using a dedicated database session, so the lookup
+        can run (and be cancelled) alongside other work on the request's session.
+        
+        Args:
+            message: The user's message.
+            allowed_patient_ids: List of patient IDs the user is allowed to access.
+            
+        Returns:
+            The extracted patient ID, or None if not found.
+        """
+        from app.database import AsyncSessionLocal
+        
+        async with AsyncSessionLocal() as session:
+            return await self._extract_patient_id(message, allowed_patient_ids, session)
+    
     async def _handle_ambiguous_patient_match(
         self,
         matched_patients: List[tuple],
@@ -1493,19 +2507,28 @@ class ChatOrchestrator:
                 
             if recent_date:
                 patient_recency.append((patient, recent_date))
-                logger.info(f"Patient {patient.first_name} {patient.last_name} has recent interaction on {recent_date}")
+                logger.info(
+                    "Patient %s %s has recent interaction on %s",
+                    patient.first_name, patient.last_name, recent_date
+                )
         
         # Sort by recency (most recent first)
         patient_recency.sort(key=lambda x: x[1], reverse=True)
         
         if patient_recency:
             # Return the most recently interacted with patient
-            logger.info(f"Resolved ambiguity using recency: {patient_recency[0][0].first_name} {patient_recency[0][0].last_name}")
+            logger.info(
+                "Resolved ambiguity using recency: %s %s",
+                patient_recency[0][0].first_name, patient_recency[0][0].last_name
+            )
             return patient_recency[0][0].id
             
         # Strategy 2: If recency doesn't help, use the highest confidence match
         highest_confidence = max(matched_patients, key=lambda x: x[1])
-        logger.info(f"Resolved ambiguity using confidence: {highest_confidence[0].first_name} {highest_confidence[0].last_name}")
+        logger.info(
+            "Resolved ambiguity using confidence: %s %s",
+            highest_confidence[0].first_name, highest_confidence[0].last_name
+        )
         return highest_confidence[0].id
     
     async def _build_context(
@@ -1552,7 +2575,7 @@ class ChatOrchestrator:
             if data_context:
                 context.append({
                     "role": "system",
-                    "content": f"De-identified clinical summary:\n{data_context}"
+                    "content": f"{DATA_CONTEXT_PREFIX}{data_context}"
                 })
         
         # Add previous messages
@@ -1568,7 +2591,37 @@ class ChatOrchestrator:
             "content": message
         })
         
-        return context
+        return self._drop_repeated_data_messages(context)
+    
+    @staticmethod
+    def _drop_repeated_data_messages(context: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Keep only the most recent copy of each data message.
+        
+        Clients that echo earlier context back in the history would otherwise
+        send the same data block once per turn.
+        
+        Args:
+            context: The context for the LLM.
+            
+        Returns:
+            The context without repeated data messages.
+        """
+        seen = set()
+        kept = []
+        for msg in reversed(context):
+            if msg["role"] == "system" and msg["content"].startswith(DATA_CONTEXT_PREFIX):
+                if msg["content"] in seen:
+                    continue
+                seen.add(msg["content"])
+            kept.append(msg)
+        
+        if len(kept) == len(context):
+            return context
+        
+        logger.info("Dropped %d repeated data messages from the context", len(context) - len(kept))
+        kept.reverse()
+        return kept
     
     async def _apply_phi_protection(
         self,
@@ -1599,17 +2652,17 @@ class ChatOrchestrator:
                 raw_data = value.get("data", {})
                 
                 # Log the raw data types for debugging
-                logger.info(f"Raw data keys before PHI protection: {list(raw_data.keys())}")
+                logger.info("Raw data keys before PHI protection: %s", list(raw_data))
                 
                 # Apply minimum necessary filtering with LLM enhancement
-                min_necessary_filter = MinimumNecessaryFilter()
+                min_necessary_filter = get_minimum_necessary_filter()
                 filtered_data = await min_necessary_filter.extract(message, raw_data)
                 
                 # Apply de-identification
-                safe_data = self.phi_masker.deidentify_patient_data(filtered_data)
+                safe_data = self._deidentify_patient_record(filtered_data)
                 
                 # Log the safe data types for debugging
-                logger.info(f"Safe data keys after PHI protection: {list(safe_data.keys())}")
+                logger.info("Safe data keys after PHI protection: %s", list(safe_data))
                 
                 # Ensure data_types is always a list
                 if "data_types" in value and not isinstance(value["data_types"], list):
@@ -1624,7 +2677,7 @@ class ChatOrchestrator:
                     if vital_type in raw_data:
                         # Copy the vital sign data to the safe data
                         safe_data[vital_type] = raw_data[vital_type]
-                        logger.info(f"Preserved {vital_type} data in PHI protection: {raw_data[vital_type]}")
+                        logger.debug("Preserved %s data in PHI protection: %s", vital_type, raw_data[vital_type])
                 
                 # Reconstruct the patient_data structure
                 protected_data[key] = {
@@ -1640,6 +2693,29 @@ class ChatOrchestrator:
         
         return protected_data
     
+    def _deidentify_patient_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        De-identify a patient record, reusing the result for identical content.
+        
+        Args:
+            record: The filtered patient record.
+            
+        Returns:
+            A fresh top-level copy of the de-identified record.
+        """
+        digest = hashlib.blake2b(
+            orjson.dumps(record, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str),
+            digest_size=16
+        ).digest()
+        
+        safe_data = self._deidentified_cache.get(digest)
+        if safe_data is None:
+            safe_data = self.phi_masker.deidentify_patient_data(record)
+            self._deidentified_cache.put(digest, safe_data)
+        
+        # Callers add keys to the result, which must not leak into the cache
+        return dict(safe_data)
+    
     def _get_system_prompt(self, role: str, query_type: str, data_scope: DataScope) -> str:
         """
         Get the system prompt based on the user's role and query type.
@@ -1652,159 +2728,27 @@ class ChatOrchestrator:
         Returns:
             The system prompt.
         """
-         # Get current date and time
+        # Get current date and time
         current_datetime = datetime.now()
         current_date_str = current_datetime.strftime("%Y-%m-%d")
         current_time_str = current_datetime.strftime("%H:%M:%S")
         
-        base_prompt = f"""
-        You are CareIQ, a healthcare assistant for the Patient360 platform.
-        If you get the data as empty then respond the answer correctly rather than "I don't have that information".
-        You provide accurate, helpful information based on the data available to you.
-        You NEVER make up information or hallucinate data that isn't provided to you.
-        If you don't have specific information, say so clearly.
-        If you have any queries relevant to upcoming appointment or something which needs time comparison of data to answer then use this date and time to analyze the data coming to you and then answer accordingly.
-         CURRENT DATE AND TIME:
-            Today's date: {current_date_str}
-            Current time: {current_time_str} 
-        while answering the queries be mindful of the past present and future of the data.
-        CRITICAL ERROR HANDLING:
-        - If you see an error message in the data (e.g., "error": "Error getting daily vitals"),
-          clearly explain to the user that there was a technical issue retrieving their data.
-        - Be transparent about system errors while maintaining a reassuring tone.
-        - When data contains error messages, acknowledge them directly in your response.
-        
-        CRITICAL PHI PROTECTION RULES:
-        - The data provided to you has been de-identified for privacy protection
-        - DO NOT attempt to re-identify patients or infer protected information
-        - DO NOT include specific dates, names, or identifiers in your responses
-        - Focus on clinical insights and general patterns, not individual identifiers
-        """
-        
-        role_specific_prompts = {
-            "patient": """
-            You are speaking directly to a patient about their own health data.
-            Use a friendly, supportive tone and avoid medical jargon when possible.
-            Explain medical terms in simple language.
-            ONLY discuss the patient's own data, never mention other patients.
-            
-            When technical errors occur (indicated by error messages in the data),
-            be transparent but reassuring. Explain that their data couldn't be retrieved
-            due to a temporary technical issue, and suggest they try again later or
-            contact support if the problem persists.
-            """,
-            
-            "doctor": """
-            You are speaking to a healthcare provider about patient data.
-            Use professional medical terminology and be precise.
-            You can reference specific lab values, medications, and clinical findings.
-            Only discuss patients that this doctor has treated.
-            
-            IMPORTANT: When a doctor mentions a patient by name, the system will automatically
-            identify the correct patient based on the name. If multiple patients have similar names,
-            the system will use recent interactions to determine the most likely patient.
-            """,
-            
-            "hospital": """
-            You are speaking to a hospital administrator about hospital-level data.
-            Focus on aggregated statistics and trends, not individual patient details.
-            Use business and healthcare administration terminology.
-            Highlight operational insights and efficiency metrics.
-            """
-        }
-        
-        query_specific_prompts = {
-            "data": """
-            You are providing specific data from the patient record.
-            Be precise and factual, citing dates and values when available.
-            Only share data that is explicitly provided in the context.
-            Remember: dates and names have been de-identified for privacy.
-            
-            IMPORTANT: If you encounter an error message in the data (e.g., "error": "Error getting daily vitals"),
-            clearly communicate to the user that there was a technical issue retrieving the requested information.
-            Explain that their data could not be accessed at this time due to a system error.
-            """,
-            
-            "explanation": """
-            You are explaining medical concepts or terminology.
-            Provide clear, accurate explanations at an appropriate level for the user.
-            Use analogies or simplified explanations when helpful.
-            """,
-            
-            "analytics": """
-            You are providing analysis of aggregated healthcare data.
-            Focus on trends, patterns, and insights from the data.
-            Avoid discussing individual patients and focus on population-level insights.
-            """,
-            
-            "recommendation": """
-            You are providing health recommendations based on patient data.
-            Be cautious and conservative in your recommendations.
-            Always clarify that these are general suggestions, not medical advice.
-            Encourage the user to consult with their healthcare provider for personalized advice.
-            """,
-            
-            "action": """
-            You are helping the user perform healthcare-related actions.
-            Guide them through the process of scheduling appointments, requesting medication refills,
-            or contacting their healthcare provider.
-            Be clear about what actions are available and how to initiate them.
-            """,
-            
-            # Hybrid prompts for common combinations
-            "data+explanation": """
-            You are providing specific patient data AND explaining what it means.
-            First present the data clearly and factually, then explain its significance.
-            Use simple language to help the patient understand their health information.
-            Remember to check for error messages in the data and communicate them clearly.
-            """,
-            
-            "data+recommendation": """
-            You are providing specific patient data AND offering general health recommendations.
-            Present the data first, then offer context-appropriate suggestions.
-            Be very clear that your recommendations are general in nature, not medical advice.
-            Always encourage consulting with a healthcare provider for personalized guidance.
-            """,
-            
-            "explanation+recommendation": """
-            You are explaining medical concepts AND offering general health recommendations.
-            Provide clear explanations of medical terms or concepts first.
-            Then offer general recommendations related to the topic.
-            Be very clear that your recommendations are general in nature, not medical advice.
-            """
-        }
-        
-        # Combine prompts
-        combined_prompt = base_prompt
-        
-        if role in role_specific_prompts:
-            combined_prompt += "\n\n" + role_specific_prompts[role]
+        # Static instructions first so repeated requests share a cacheable prefix
+        static_prompt = build_static_system_prompt(role, query_type)
+        scope_prompt = build_system_prompt_scope(
+            role,
+            # Sorted: set iteration order varies between processes (hash randomization)
+            tuple(sorted(data_scope.allowed_data_types)),
+            tuple(sorted(data_scope.patient_id_set)) if role == "doctor" else (),
+            data_scope.hospital_ids[0] if role == "hospital" and data_scope.hospital_ids else None
+        )
         
-        # Handle hybrid query types
-        if "+" in query_type:
-            # Check if we have a specific prompt for this hybrid type
-            if query_type in query_specific_prompts:
-                combined_prompt += "\n\n" + query_specific_prompts[query_type]
-            else:
-                # If no specific hybrid prompt, combine individual prompts
-                query_types = query_type.split("+")
-                for qt in query_types:
-                    if qt in query_specific_prompts:
-                        combined_prompt += "\n\n" + query_specific_prompts[qt]
-        elif query_type in query_specific_prompts:
-            combined_prompt += "\n\n" + query_specific_prompts[query_type]
-        
-        # Add data scope information
-        combined_prompt += f"\n\nYou can ONLY access the following data types: {', '.join(data_scope.allowed_data_types)}."
-        
-        if role == "patient":
-            combined_prompt += "\n\nYou can ONLY discuss the patient's own health data, never other patients."
-        elif role == "doctor":
-            combined_prompt += f"\n\nYou can ONLY discuss patients with these IDs: {data_scope.patient_ids}."
-        elif role == "hospital":
-            combined_prompt += f"\n\nYou can ONLY discuss aggregated data for hospital ID: {data_scope.hospital_ids[0] if data_scope.hospital_ids else 'None'}."
-        
-        return combined_prompt
+        return (
+            f"{static_prompt}{scope_prompt}\n\n"
+            f"        CURRENT DATE AND TIME:\n"
+            f"            Today's date: {current_date_str}\n"
+            f"            Current time: {current_time_str}"
+        )
     
     def _format_data_for_context(self, data: Dict[str, Any], query_type: str) -> str:
         """
@@ -1820,44 +2764,178 @@ class ChatOrchestrator:
         if not data:
             return ""
         
-        # Convert data to a formatted string
-        return json.dumps(data, indent=2)
+        # Compact JSON: indentation only costs prompt tokens. Sorted keys keep
+        # the text stable between requests
+        return orjson.dumps(
+            data,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+            default=str
+        ).decode()
     
-    async def _generate_response(self, context: List[Dict[str, str]]) -> str:
+    async def _generate_response(
+        self,
+        context: List[Dict[str, str]],
+        query_type: Optional[str] = None,
+        role: Optional[str] = None
+    ) -> str:
         """
         Generate a response from the LLM.
         
         Args:
             context: The context for the LLM.
+            query_type: The type of query, used to pick the model tier and token budget.
+            role: The user's role, used to pick the model tier.
             
         Returns:
             The generated response.
         """
-        # Log the full context being sent to the LLM
-        logger.info("Full LLM context:")
-        for i, msg in enumerate(context):
-            logger.info(f"Message {i} - Role: {msg['role']}")
-            # Truncate content if it's too long for logs
-            content = msg['content']
-            if len(content) > 500:
-                content = content[:500] + "... [truncated]"
-            logger.info(f"Content: {content}")
+        model = self._prepare_generation(context, query_type, role)
         
-        try:
+        async def send(messages: List[Dict[str, str]], max_tokens: int) -> str:
             # Call OpenAI API
-            response = await client.chat.completions.create(
-                model="gpt-4o",
-                messages=context,
-                temperature=0.3,
-                max_tokens=500
-            )
+            async with llm_semaphore:
+                response = await get_openai_client().chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=max_tokens,
+                    prompt_cache_key=f"{role}:{query_type}"
+                )
             
             # Extract the response text
             return response.choices[0].message.content.strip()
         
+        try:
+            if self._coalescer.enabled and context[-1]["role"] == "user":
+                key = BatchCoalescer.make_key(model, context)
+                return await self._coalescer.submit(key, context, send, max_tokens_for(query_type))
+            return await send(context, max_tokens_for(query_type))
+        
+        except Exception as e:
+            logger.error(f"Error generating response: {e}")
+            return GENERATION_ERROR_MESSAGE
+    
+    async def _generate_response_cached(
+        self,
+        context: List[Dict[str, str]],
+        query_type: str,
+        role: str,
+        data_scope: DataScope
+    ) -> str:
+        """
+        Generate a response, reusing the answer to a semantically equivalent
+        question asked over the same data.
+        
+        Args:
+            context: The context for the LLM.
+            query_type: The type of query.
+            role: The user's role.
+            data_scope: The user's data scope.
+            
+        Returns:
+            The generated (or cached) response.
+        """
+        router = get_query_router()
+        if router is None:
+            return await self._generate_response(context, query_type=query_type, role=role)
+        
+        # The system prompt only varies by role, query type, scope and time, so it is
+        # left out; the data context and history are part of the partition
+        namespace = hashlib.blake2b(orjson.dumps([
+            role,
+            query_type,
+            data_scope.cache_key(),
+            [(msg["role"], msg["content"]) for msg in context[1:-1]]
+        ]), digest_size=16).hexdigest()
+        
+        query_vector = await asyncio.to_thread(router.embed, context[-1]["content"])
+        response = answer_cache.get(namespace, query_vector)
+        if response is not None:
+            logger.info("Using semantically cached response")
+            return response
+        
+        response = await self._generate_response(context, query_type=query_type, role=role)
+        
+        # Don't cache failed generations
+        if response != GENERATION_ERROR_MESSAGE:
+            answer_cache.put(namespace, query_vector, response)
+        
+        return response
+    
+    async def _generate_response_stream(
+        self,
+        context: List[Dict[str, str]],
+        query_type: Optional[str] = None,
+        role: Optional[str] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Generate a response from the LLM, yielding text as it is produced.
+        
+        Args:
+            context: The context for the LLM.
+            query_type: The type of query, used to pick the model tier and token budget.
+            role: The user's role, used to pick the model tier.
+            
+        Yields:
+            Raw (unsanitized) text deltas.
+        """
+        model = self._prepare_generation(context, query_type, role)
+        generated = False
+        
+        try:
+            async with llm_semaphore:
+                stream = await get_openai_client().chat.completions.create(
+                    model=model,
+                    messages=context,
+                    temperature=0.3,
+                    max_tokens=max_tokens_for(query_type),
+                    prompt_cache_key=f"{role}:{query_type}",
+                    stream=True
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        generated = True
+                        yield chunk.choices[0].delta.content
+        
         except Exception as e:
             logger.error(f"Error generating response: {e}")
-            return "I'm sorry, I encountered an error processing your request. Please try again later."
+            # Text already sent can't be taken back, so only a failed start is replaced
+            if not generated:
+                yield GENERATION_ERROR_MESSAGE
+    
+    def _prepare_generation(
+        self,
+        context: List[Dict[str, str]],
+        query_type: Optional[str],
+        role: Optional[str]
+    ) -> str:
+        """
+        Log the context being sent to the LLM and pick the model for it.
+        
+        Args:
+            context: The context for the LLM.
+            query_type: The type of query.
+            role: The user's role.
+            
+        Returns:
+            The model name.
+        """
+        # Log the full context being sent to the LLM
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Full LLM context:")
+            for i, msg in enumerate(context):
+                logger.debug("Message %d - Role: %s", i, msg['role'])
+                # Truncate content if it's too long for logs
+                content = msg['content']
+                if len(content) > 500:
+                    content = content[:500] + "... [truncated]"
+                logger.debug("Content: %s", content)
+        
+        # Without a query type there is nothing to route on, so keep the premium model
+        tier = select_model_tier(query_type, role, context) if query_type else "premium"
+        model = MODEL_BY_TIER[tier]
+        logger.info("Generating response with %s (%s tier)", model, tier)
+        return model
     
     def _validate_response(self, response: str, data_scope: DataScope) -> str:
         """
@@ -2,7 +2,7 @@
 
 import re
 import spacy
-from typing import Dict, Any
+from typing import Dict, Any, List
 from uuid import uuid4
 import logging
 
@@ -32,6 +32,9 @@ PHI_REGEX = [
     r"\b\S+@\S+\.\S+\b",               # emails
 ]
 
+# Compiled once; applied in order, since later patterns also see earlier redactions
+PHI_REGEX_COMPILED = [re.compile(pattern) for pattern in PHI_REGEX]
+
 class PHIMasker:
     """
     Enterprise-grade PHI masker (NER + regex) with medical date preservation.
@@ -65,11 +68,7 @@ class PHIMasker:
         # 1️⃣ NER masking
         if nlp:
             try:
-                doc = nlp(text)
-                masked = text
-                for ent in doc.ents:
-                    if ent.label_ in PHI_ENTITY_LABELS:
-                        masked = masked.replace(ent.text, "[REDACTED]")
+                masked = self._mask_entities(text, nlp(text))
             except Exception as e:
                 logger.error(f"Error in NER masking: {e}")
                 masked = text
@@ -77,11 +76,48 @@ class PHIMasker:
             masked = text
 
         # 2️⃣ Regex masking
-        for pattern in PHI_REGEX:
-            masked = re.sub(pattern, "[REDACTED]", masked)
+        return self._mask_patterns(masked)
+
+    def deidentify_texts(self, texts: List[str]) -> List[str]:
+        """
+        De-identify many strings at once: each distinct string is masked once,
+        and NER runs as a single batched spaCy pipe instead of one call per string.
+        """
+        unique = list(dict.fromkeys(text for text in texts if text))
+        if not unique:
+            return list(texts)
+
+        if nlp:
+            try:
+                masked = [
+                    self._mask_entities(text, doc)
+                    for text, doc in zip(unique, nlp.pipe(unique))
+                ]
+            except Exception as e:
+                logger.error(f"Error in batched NER masking, masking one by one: {e}")
+                return [self.deidentify_text(text) for text in texts]
+        else:
+            masked = unique
+
+        lookup = {text: self._mask_patterns(value) for text, value in zip(unique, masked)}
+        return [lookup[text] if text else text for text in texts]
 
+    @staticmethod
+    def _mask_entities(text: str, doc) -> str:
+        """Replace the PHI entities spaCy found in a text."""
+        masked = text
+        for ent in doc.ents:
+            if ent.label_ in PHI_ENTITY_LABELS:
+                masked = masked.replace(ent.text, "[REDACTED]")
         return masked
 
+    @staticmethod
+    def _mask_patterns(text: str) -> str:
+        """Apply the PHI regexes to a text."""
+        for pattern in PHI_REGEX_COMPILED:
+            text = pattern.sub("[REDACTED]", text)
+        return text
+
     def is_medical_date_field(self, key: str) -> bool:
         """
         Dynamically determine if a field is a medical date field based on naming patterns.
@@ -114,6 +150,33 @@ class PHIMasker:
     def deidentify_patient_data(self, data: Any) -> Any:
         """
         Recursively de-identify structured PHI with dynamic medical date preservation.
+        
+        The strings to mask are collected first and de-identified in one batch,
+        then put back in the same traversal order.
+        """
+        texts: List[str] = []
+        self._collect_texts(data, texts)
+        masked = iter(self.deidentify_texts(texts))
+        return self._rebuild(data, masked)
+
+    def _collect_texts(self, data: Any, texts: List[str]) -> None:
+        """
+        Gather the strings deidentify_patient_data masks, in traversal order.
+        """
+        if isinstance(data, dict):
+            for key, value in data.items():
+                # Skip patient identifiers, preserve medical dates and medication information
+                if not self.is_patient_identifier(key) and not self.is_medical_field(key):
+                    self._collect_texts(value, texts)
+        elif isinstance(data, list):
+            for item in data:
+                self._collect_texts(item, texts)
+        elif isinstance(data, str):
+            texts.append(data)
+
+    def _rebuild(self, data: Any, masked: Any) -> Any:
+        """
+        Rebuild the data with identifiers dropped and collected strings replaced.
         """
         if isinstance(data, dict):
             result = {}
@@ -125,15 +188,15 @@ class PHIMasker:
                 # Preserve medical dates and medication information
                 if self.is_medical_field(key):
                     result[key] = value
-                    logger.debug(f"Preserving medical field: {key}")
+                    logger.debug("Preserving medical field: %s", key)
                 else:
-                    result[key] = self.deidentify_patient_data(value)
+                    result[key] = self._rebuild(value, masked)
             return result
         
         if isinstance(data, list):
-            return [self.deidentify_patient_data(item) for item in data]
+            return [self._rebuild(item, masked) for item in data]
         
         if isinstance(data, str):
-            return self.deidentify_text(data)
+            return next(masked)
         
         return data
@@ -0,0 +1,193 @@
+"""
+Local query router for the Patient360 Chatbot.
+
+Classifies user queries into the chatbot's query types without an LLM call:
+a regex rule pass handles the common phrasings, and a small sentence
+embedding model (all-MiniLM-L6-v2) picks the closest type for the rest.
+"""
+
+import os
+import re
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Sentence embeddings (optional, the orchestrator falls back to the LLM without them)
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_SUPPORT = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_SUPPORT = False
+
+ROUTER_MODEL_NAME = os.getenv("QUERY_ROUTER_MODEL", "all-MiniLM-L6-v2")
+
+# Query types in the order they are joined for hybrid queries
+PRIMARY_TYPES = ("data", "explanation", "analytics", "recommendation", "action")
+
+# Keyword rules per query type, checked against the lowercased message. Only strong,
+# type-specific cues are listed; generic words ("my", "total", "why") are left to the
+# embedding model, which sees the whole message
+QUERY_RULES: Dict[str, "re.Pattern[str]"] = {
+    "data": re.compile(
+        r"\b(labs?|lab results?|test results?|medications?|meds|"
+        r"prescriptions?|vitals?|heart rate|pulse|blood pressure|bp|oxygen|spo2|"
+        r"temperature|appointments?|allerg(y|ies)|readings?|wearable|steps|sleep)\b"
+    ),
+    "explanation": re.compile(
+        r"\b(explain|meaning|means?|define|definition|what does|what do|"
+        r"what (is|are) (a|an)\b|what (is|are)(?! (my|the|this|that|our|patient)\b)|"
+        r"side effects?|how does)\b"
+    ),
+    "analytics": re.compile(
+        r"\b(how many patients|statistics|stats|occupancy|readmissions?|admissions?|"
+        r"length of stay|most common|percentage|census)\b"
+    ),
+    "recommendation": re.compile(
+        r"\b(should i|should we|recommend\w*|advice|advise|concerned|worried|"
+        r"is it safe|safe to|dangerous|too (high|low)|what can i do|suggest\w*|"
+        r"guidelines?|treatment protocol)\b"
+    ),
+    "action": re.compile(
+        r"\b(schedule|book|cancel|reschedule|refill|remind( me)?|renew|set up)\b"
+    ),
+}
+
+# Example queries per type; their embedding centroids classify messages the rules miss
+ANCHOR_QUERIES: Dict[str, List[str]] = {
+    "data": [
+        "What was my heart rate yesterday?",
+        "Show me my latest lab results",
+        "What medications am I taking?",
+        "When is my next appointment?",
+        "Show the vitals for this patient",
+    ],
+    "explanation": [
+        "What does elevated troponin mean?",
+        "Explain what hypertension is",
+        "What is an A1C test?",
+        "How does metformin work?",
+        "What are the symptoms of anemia?",
+    ],
+    "analytics": [
+        "How many patients were admitted last month?",
+        "What's the average length of stay?",
+        "Show me readmission rates for the past quarter",
+        "What are the most common diagnoses in our hospital?",
+        "What's the current bed occupancy rate?",
+    ],
+    "recommendation": [
+        "Should I be concerned about my cholesterol levels?",
+        "What should I do to lower my blood pressure?",
+        "Is it safe to exercise with my condition?",
+        "What are the guidelines for diabetes management?",
+        "What diet would you recommend for me?",
+    ],
+    "action": [
+        "Schedule an appointment with my doctor",
+        "Refill my prescription",
+        "Cancel my appointment next week",
+        "Remind me to take my medication",
+        "Book a follow-up visit",
+    ],
+}
+
+
+class QueryRouter:
+    """
+    Rule-first query classifier with a sentence-embedding fallback.
+    """
+    
+    def __init__(self, model_name: str = ROUTER_MODEL_NAME):
+        """
+        Load the embedding model and precompute one centroid per query type.
+        
+        Args:
+            model_name: The sentence-transformers model to use.
+        """
+        self.model = SentenceTransformer(model_name, device="cpu")
+        
+        # Recent query embeddings, shared by classification and the RAG cache
+        self.embed = lru_cache(maxsize=1024)(self._encode)
+        
+        centroids = []
+        for query_type in PRIMARY_TYPES:
+            embeddings = self.model.encode(ANCHOR_QUERIES[query_type], normalize_embeddings=True)
+            centroid = embeddings.mean(axis=0)
+            centroids.append(centroid / np.linalg.norm(centroid))
+        self.centroids = np.vstack(centroids).astype(np.float32)
+    
+    def _encode(self, message: str) -> np.ndarray:
+        """L2-normalized embedding of a message."""
+        return self.model.encode(message, normalize_embeddings=True)
+    
+    @staticmethod
+    def classify_by_rules(message: str) -> Optional[str]:
+        """
+        Classify a query with the keyword rules.
+        
+        Args:
+            message: The user's message.
+        
+        Returns:
+            The (possibly hybrid) query type, or None if no rule matched.
+        """
+        text = message.lower()
+        matched = [query_type for query_type in PRIMARY_TYPES if QUERY_RULES[query_type].search(text)]
+        return "+".join(matched) if matched else None
+    
+    def classify_by_embedding(self, message: str) -> str:
+        """
+        Classify a query as the type with the closest anchor centroid.
+        
+        Args:
+            message: The user's message.
+        
+        Returns:
+            A single query type.
+        """
+        embedding = self.embed(message)
+        return PRIMARY_TYPES[int(np.argmax(self.centroids @ embedding))]
+    
+    async def classify(self, message: str) -> str:
+        """
+        Classify a query, running the embedding model off the event loop
+        when the rules don't match.
+        
+        Args:
+            message: The user's message.
+        
+        Returns:
+            The query type.
+        """
+        query_type = self.classify_by_rules(message)
+        if query_type is not None:
+            return query_type
+        
+        return await asyncio.to_thread(self.classify_by_embedding, message)
+
+
+@lru_cache(maxsize=1)
+def get_query_router() -> Optional[QueryRouter]:
+    """
+    Load the query router once per process.
+    
+    Returns:
+        The router, or None if sentence-transformers or the model isn't available.
+    """
+    if not SENTENCE_TRANSFORMERS_SUPPORT:
+        logger.warning("sentence-transformers is not installed. Query classification will use the LLM.")
+        return None
+    
+    try:
+        router = QueryRouter()
+        logger.info(f"Loaded local query router ({ROUTER_MODEL_NAME})")
+        return router
+    except Exception as e:
+        logger.error(f"Failed to load local query router: {e}")
+        return None
@@ -18,6 +18,8 @@ from openai import OpenAI
 
 # Import from task_store instead of pdf_api to avoid circular imports
 from app.chatbot.task_store import background_tasks, save_background_tasks
+from app.chatbot.semcache import rag_cache
+from app.chatbot.llm_client import get_sync_openai_client
 
 # Disable ChromaDB telemetry
 os.environ["ANONYMIZED_TELEMETRY"] = "False"
@@ -158,8 +160,8 @@ class RAGPipeline:
                 This is a requirement from ChromaDB's API
                 """
                 try:
-                    import openai
-                    client = openai.OpenAI(api_key=self._api_key)
+                    # Shared client, so each query doesn't open a new connection pool
+                    client = get_sync_openai_client()
                     
                     # Split into batches to avoid token limits
                     batch_size = 100
@@ -434,6 +436,24 @@ class RAGPipeline:
                 "distance": 1.0
             }]
     
+    async def warmup(self, queries: List[str]) -> None:
+        """
+        Prime the embedding client and vector index so the first user query
+        doesn't pay the cold-start cost.
+        
+        Args:
+            queries: Representative queries to embed and search.
+        """
+        if self.collection is None:
+            logger.warning("Collection is not available. Skipping RAG warmup.")
+            return
+        
+        try:
+            self.collection.query(query_texts=queries, n_results=1)
+            logger.info(f"RAG pipeline warmed up with {len(queries)} queries")
+        except Exception as e:
+            logger.warning(f"RAG warmup failed (non-critical): {e}")
+    
     async def add_knowledge(self, items: List[Dict[str, Any]], task_id: str = None) -> bool:
         """
         Add knowledge items to the RAG pipeline.
@@ -533,6 +553,9 @@ class RAGPipeline:
                         })
                         save_background_tasks()
             
+            # Cached query results may be missing the new items
+            rag_cache.clear()
+            
             # Log summary
             if failed_batches > 0:
                 logger.warning(f"Completed with {failed_batches} failed batches. Successfully added {successful_items}/{total_items} items.")
@@ -585,6 +608,7 @@ class RAGPipeline:
         try:
             # Delete from collection
             self.collection.delete(ids=ids)
+            rag_cache.clear()
             
             logger.info(f"Deleted {len(ids)} knowledge items from collection")
             return True
@@ -615,6 +639,7 @@ class RAGPipeline:
                 documents=[item["text"]],
                 metadatas=[item["metadata"]]
             )
+            rag_cache.clear()
             
             logger.info(f"Updated knowledge item: {item['id']}")
             return True
@@ -5,8 +5,11 @@ This module implements RBAC for the chatbot, ensuring that users can only
 access data they are authorized to see.
 """
 
+import hashlib
 import logging
 from typing import List, Optional, Set
+
+import orjson
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
@@ -47,6 +50,26 @@ class DataScope:
         self.patient_ids = patient_ids or []
         self.hospital_ids = hospital_ids or []
         self.can_access_analytics = can_access_analytics
+        
+        # O(1) membership checks; patient_ids keeps its order ("first allowed patient")
+        self.patient_id_set = frozenset(self.patient_ids)
+        self.hospital_id_set = frozenset(self.hospital_ids)
+    
+    def cache_key(self) -> str:
+        """
+        Return a short, stable hash of everything this scope grants access to.
+        
+        Used to partition caches so a cached answer is only ever served to a
+        user with exactly the same access.
+        """
+        payload = orjson.dumps({
+            "user_role": self.user_role,
+            "allowed_data_types": sorted(self.allowed_data_types),
+            "patient_ids": sorted(self.patient_ids),
+            "hospital_ids": sorted(self.hospital_ids),
+            "can_access_analytics": self.can_access_analytics
+        })
+        return hashlib.blake2b(payload, digest_size=8).hexdigest()
     
     def __str__(self) -> str:
         """Return a string representation of the data scope."""
@@ -177,13 +200,13 @@ def validate_data_access(data_scope: DataScope, data_type: str, entity_id: Optio
     
     # For patient data, check if the patient ID is allowed
     if data_type in {"labs", "medications", "vitals", "appointments", "care_plans", "encounters", "diagnoses"}:
-        if entity_id is not None and entity_id not in data_scope.patient_ids:
+        if entity_id is not None and entity_id not in data_scope.patient_id_set:
             logger.warning(f"Access denied: patient ID {entity_id} not allowed for user")
             return False
     
     # For hospital data, check if the hospital ID is allowed
     if data_type in {"aggregated_data", "analytics", "hospital_stats"}:
-        if entity_id is not None and entity_id not in data_scope.hospital_ids:
+        if entity_id is not None and entity_id not in data_scope.hospital_id_set:
             logger.warning(f"Access denied: hospital ID {entity_id} not allowed for user")
             return False
     
@@ -0,0 +1,74 @@
+"""
+Exact-match cache for the Patient360 Chatbot.
+
+A bounded LRU cache with per-entry TTLs, used by the orchestrator for
+query classifications, de-identified records and hospital/analytics data.
+"""
+
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CacheKey = Hashable
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of values with a per-entry TTL.
+    """
+    
+    def __init__(self, max_size: int = 1000, ttl_seconds: float = 900):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_size: Maximum number of cached values.
+            ttl_seconds: How long a cached value stays valid.
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, response), least recently used first
+        self._store: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+    
+    def get(self, key: CacheKey) -> Optional[Any]:
+        """
+        Get a cached response.
+        
+        Args:
+            key: The cache key.
+            
+        Returns:
+            The cached response, or None on a miss or expired entry.
+        """
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, response = entry
+        if time.monotonic() > expires_at:
+            del self._store[key]
+            return None
+        
+        self._store.move_to_end(key)
+        return response
+    
+    def put(self, key: CacheKey, response: Any, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Cache a response.
+        
+        Args:
+            key: The cache key.
+            response: The response to cache.
+            ttl_seconds: How long this response stays valid (default: the cache's TTL).
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._store[key] = (time.monotonic() + ttl, response)
+        self._store.move_to_end(key)
+        
+        while len(self._store) > self.max_size:
+            self._store.popitem(last=False)
+
@@ -16,6 +16,13 @@ PHI_PATTERNS = [
     r"\b[A-Z0-9]{6,}\b"                 # MRN / IDs
 ]
 
+# Compiled once, paired with a character every match needs so a pattern
+# (the backtracking-prone email one in particular) is skipped on lines without it
+PHI_REGEXES = [
+    (re.compile(pattern), required)
+    for pattern, required in zip(PHI_PATTERNS, ["/", None, "@", None, None])
+]
+
 # Medical context terms - dynamically detect medical contexts
 MEDICAL_CONTEXT_TERMS = [
     # Appointment related
@@ -52,13 +59,45 @@ def sanitize_response(text: str) -> str:
     for line in lines:
         if is_medical_context(line):
             # Preserve medical context lines
-            logger.debug(f"Preserving medical context line: {line[:50]}...")
+            logger.debug("Preserving medical context line: %s...", line[:50])
             result_lines.append(line)
         else:
             # Apply PHI patterns to other lines
             processed_line = line
-            for pattern in PHI_PATTERNS:
-                processed_line = re.sub(pattern, "[REDACTED]", processed_line)
+            for regex, required in PHI_REGEXES:
+                if required is None or required in processed_line:
+                    processed_line = regex.sub("[REDACTED]", processed_line)
             result_lines.append(processed_line)
     
     return '\n'.join(result_lines)
+
+
+class StreamingSanitizer:
+    """
+    Incremental sanitize_response for streamed text.
+    
+    sanitize_response works line by line, so each line is released as soon as
+    its newline arrives; the concatenated output matches sanitizing the full text.
+    """
+    
+    def __init__(self):
+        self._pending = ""
+    
+    def feed(self, text: str) -> str:
+        """
+        Add streamed text and return the sanitized lines it completed.
+        """
+        self._pending += text
+        cut = self._pending.rfind("\n")
+        if cut == -1:
+            return ""
+        
+        complete, self._pending = self._pending[:cut], self._pending[cut + 1:]
+        return sanitize_response(complete) + "\n"
+    
+    def flush(self) -> str:
+        """
+        Return the sanitized final (unterminated) line once the stream ends.
+        """
+        pending, self._pending = self._pending, ""
+        return sanitize_response(pending)
@@ -0,0 +1,271 @@
+"""
+Semantic cache for the Patient360 Chatbot.
+
+Caches results for queries that are worded differently but mean the same
+thing. Query embeddings are bucketed with random-projection LSH, so a lookup
+only compares against the few entries that share its bucket. A cache can be
+mirrored to SQLite so it survives restarts; writes to the mirror are applied
+by a background thread, off the event loop.
+"""
+
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+BucketKey = Tuple[str, int]
+
+
+class SemanticCache:
+    """
+    Bounded LSH-bucketed cache of payloads keyed by normalized query embeddings.
+    """
+    
+    def __init__(
+        self,
+        num_planes: int = 16,
+        threshold: float = 0.95,
+        ttl_seconds: float = 3600,
+        max_entries: int = 2048,
+        seed: int = 0,
+        persist_path: Optional[str] = None
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            num_planes: Number of random hyperplanes, i.e. bits per bucket id.
+            threshold: Minimum cosine similarity for a hit.
+            ttl_seconds: How long an entry stays valid, unless put gives its own TTL.
+            max_entries: Maximum number of entries before the oldest is evicted.
+            seed: Seed for the hyperplanes, fixed so bucket ids are stable.
+            persist_path: SQLite file to mirror entries to, or None to stay in memory.
+                Payloads must be JSON-serializable, and must not contain PHI.
+        """
+        # Hyperplanes are drawn on first use, once the embedding dimension is known
+        self._planes: Optional[np.ndarray] = None
+        self._num_planes = num_planes
+        self._seed = seed
+        self._bit_weights = 1 << np.arange(num_planes, dtype=np.uint64)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        
+        # entry id -> (bucket key, vector, payload, expires_at), oldest first
+        self._entries: "OrderedDict[int, Tuple[BucketKey, np.ndarray, Any, float]]" = OrderedDict()
+        self._buckets: Dict[BucketKey, List[int]] = {}
+        self._next_id = 0
+        
+        # SQLite mirror writes, applied in order by a single writer thread
+        self._store_queue: "Optional[queue.SimpleQueue[Optional[Tuple[str, Tuple]]]]" = None
+        self._store_thread: Optional[threading.Thread] = None
+        if persist_path:
+            self._open_store(persist_path)
+    
+    def _open_store(self, path: str) -> None:
+        """Open the SQLite mirror and load its unexpired entries."""
+        try:
+            store = sqlite3.connect(path, check_same_thread=False)
+            # A cache can lose its last writes on a crash; don't fsync on the event loop
+            store.execute("PRAGMA journal_mode=WAL")
+            store.execute("PRAGMA synchronous=OFF")
+            store.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "id INTEGER PRIMARY KEY, namespace TEXT, vector BLOB, payload BLOB, saved_at REAL)"
+            )
+            store.execute("DELETE FROM entries WHERE saved_at < ?", (time.time() - self.ttl_seconds,))
+            rows = store.execute(
+                "SELECT id, namespace, vector, payload, saved_at FROM entries ORDER BY id DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+            store.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Semantic cache store {path} unavailable, caching in memory only: {e}")
+            return
+        
+        # Wall-clock save times map onto the monotonic clock used for TTLs
+        offset = time.monotonic() - time.time()
+        for entry_id, namespace, vector, payload, saved_at in reversed(rows):
+            vector = np.frombuffer(vector, dtype=np.float32)
+            key = self._bucket(namespace, vector)
+            expires_at = saved_at + offset + self.ttl_seconds
+            self._entries[entry_id] = (key, vector, orjson.loads(payload), expires_at)
+            self._buckets.setdefault(key, []).append(entry_id)
+        
+        if rows:
+            self._next_id = rows[0][0] + 1
+        
+        self._store_queue = queue.SimpleQueue()
+        self._store_thread = threading.Thread(
+            target=self._store_writer,
+            args=(store, self._store_queue),
+            name="semcache-store",
+            daemon=True
+        )
+        self._store_thread.start()
+        logger.info(f"Loaded {len(rows)} semantic cache entries from {path}")
+    
+    @staticmethod
+    def _store_writer(store: sqlite3.Connection, writes: "queue.SimpleQueue") -> None:
+        """
+        Apply queued writes to the SQLite mirror, committing once per batch of
+        writes that queued up; a None item flushes and closes the store.
+        """
+        while True:
+            write = writes.get()
+            try:
+                while write is not None:
+                    store.execute(*write)
+                    try:
+                        write = writes.get_nowait()
+                    except queue.Empty:
+                        break
+                store.commit()
+            except sqlite3.Error as e:
+                # Failures only cost persistence
+                logger.error(f"Semantic cache store write failed: {e}")
+            if write is None:
+                store.close()
+                return
+    
+    def _store_execute(self, sql: str, params: Tuple = ()) -> None:
+        """Queue a write against the SQLite mirror."""
+        if self._store_queue is not None:
+            self._store_queue.put((sql, params))
+    
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush pending writes to the SQLite mirror and stop its writer thread."""
+        if self._store_thread is None:
+            return
+        self._store_queue.put(None)
+        self._store_thread.join(timeout)
+        self._store_queue = None
+        self._store_thread = None
+    
+    def _bucket(self, namespace: str, vector: np.ndarray) -> BucketKey:
+        """Hash a vector to its bucket: one bit per hyperplane side."""
+        if self._planes is None:
+            rng = np.random.default_rng(self._seed)
+            self._planes = rng.standard_normal((self._num_planes, vector.shape[0])).astype(np.float32)
+        bits = (self._planes @ vector) > 0
+        return namespace, int(self._bit_weights[bits].sum())
+    
+    def get(self, namespace: str, vector: np.ndarray) -> Optional[Any]:
+        """
+        Find a cached payload for a semantically equivalent query.
+        
+        Args:
+            namespace: Partition of the cache (e.g. the user's role).
+            vector: L2-normalized query embedding.
+        
+        Returns:
+            The cached payload, or None on a miss.
+        """
+        bucket = self._buckets.get(self._bucket(namespace, vector))
+        if not bucket:
+            return None
+        
+        now = time.monotonic()
+        for entry_id in bucket:
+            _, cached_vector, payload, expires_at = self._entries[entry_id]
+            if now > expires_at:
+                continue
+            if float(np.dot(vector, cached_vector)) >= self.threshold:
+                return payload
+        return None
+    
+    def put(
+        self,
+        namespace: str,
+        vector: np.ndarray,
+        payload: Any,
+        ttl_seconds: Optional[float] = None
+    ) -> None:
+        """
+        Cache a payload for a query embedding.
+        
+        Expired entries in the bucket, and entries for an equivalent query,
+        are replaced by the new one.
+        
+        Args:
+            namespace: Partition of the cache (e.g. the user's role).
+            vector: L2-normalized query embedding.
+            payload: The result to cache.
+            ttl_seconds: How long this entry stays valid (default: the cache's TTL).
+                Persisted entries always reload with the cache's TTL.
+        """
+        key = self._bucket(namespace, vector)
+        now = time.monotonic()
+        
+        superseded = [
+            entry_id for entry_id in self._buckets.get(key, ())
+            if now > self._entries[entry_id][3]
+            or float(np.dot(vector, self._entries[entry_id][1])) >= self.threshold
+        ]
+        for entry_id in superseded:
+            self._remove(entry_id)
+        
+        entry_id = self._next_id
+        self._next_id += 1
+        
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[entry_id] = (key, vector, payload, now + ttl)
+        self._buckets.setdefault(key, []).append(entry_id)
+        
+        if self._store_queue is not None:
+            try:
+                row = (
+                    entry_id,
+                    namespace,
+                    vector.astype(np.float32).tobytes(),
+                    orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+                    time.time()
+                )
+            except orjson.JSONEncodeError as e:
+                logger.error(f"Semantic cache payload not persisted: {e}")
+            else:
+                self._store_execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", row)
+        
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+    
+    def _remove(self, entry_id: int) -> None:
+        """Remove an entry from the cache, its bucket and the SQLite mirror."""
+        key, _, _, _ = self._entries.pop(entry_id)
+        bucket = self._buckets[key]
+        bucket.remove(entry_id)
+        if not bucket:
+            del self._buckets[key]
+        self._store_execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+    
+    def clear(self) -> None:
+        """Drop all entries, e.g. after the underlying data changed."""
+        self._entries.clear()
+        self._buckets.clear()
+        self._store_execute("DELETE FROM entries")
+
+
+# RAG results for knowledge questions, keyed by MiniLM query embeddings. Held in
+# memory unless RAG_CACHE_PATH names a SQLite file to keep them across restarts.
+# The passages contain no PHI, but the stored vectors are embeddings of the raw,
+# unmasked user messages (which can name patients), so the file must be protected
+# like PHI.
+rag_cache = SemanticCache(persist_path=os.getenv("RAG_CACHE_PATH") or None)
+
+# Generated answers, partitioned by role, query type, scope and the data sent to the LLM
+answer_cache = SemanticCache(ttl_seconds=600)
+
+# Complete chat responses per user and scope, for standalone questions asked again.
+# Only answers that read no patient or hospital records are cached (see
+# response_cache_ttl in the orchestrator), each with a TTL from the data it drew on
+response_cache = SemanticCache(threshold=0.93, ttl_seconds=3600)
@@ -5,8 +5,7 @@ This module provides streaming response functionality for the chatbot,
 allowing the frontend to show progress updates while waiting for the full response.
 """
 
-import json
-import asyncio
+import orjson
 import logging
 from typing import AsyncGenerator, Dict, Any, List
 from fastapi import HTTPException
@@ -14,6 +13,7 @@ from fastapi import HTTPException
 from app.models import User
 from app.chatbot.rbac import DataScope
 from app.chatbot.orchestrator import ChatOrchestrator, Message
+from app.chatbot.response_guard import StreamingSanitizer, sanitize_response
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -39,7 +39,7 @@ class StreamingChatProcessor:
         previous_messages: List[Message],
         data_scope: DataScope,
         db = None
-    ) -> AsyncGenerator[str, None]:
+    ) -> AsyncGenerator[bytes, None]:
         """
         Process a chat request and stream the response with progress updates.
         
@@ -51,7 +51,7 @@ class StreamingChatProcessor:
             db: The database session.
             
         Yields:
-            Progress updates and the final response.
+            Progress updates and the final response, as JSON-encoded bytes.
         """
         try:
             # Step 1: Yield initial progress update
@@ -86,9 +86,6 @@ class StreamingChatProcessor:
             # Step 6: Yield progress update for response generation
             yield self._format_progress_update("I'm preparing your answer now...", 3, 3)
             
-            # Add a small delay to make the progress updates more visible
-            await asyncio.sleep(0.5)
-            
             # Step 7: Generate response with formatting instructions
             # Create a copy of the context list
             enhanced_context = context.copy()
@@ -109,7 +106,11 @@ Format your response to be easy to read with the following guidelines:
             system_message_found = False
             for i in range(len(enhanced_context) - 1, -1, -1):
                 if enhanced_context[i]["role"] == "system":
-                    enhanced_context[i]["content"] += "\n\n" + formatting_instructions
+                    # Replaced rather than edited in place so the audited context stays untouched
+                    enhanced_context[i] = {
+                        "role": "system",
+                        "content": enhanced_context[i]["content"] + "\n\n" + formatting_instructions
+                    }
                     system_message_found = True
                     break
                     
@@ -120,11 +121,30 @@ Format your response to be easy to read with the following guidelines:
                     "content": formatting_instructions
                 })
             
-            response_text = await self.orchestrator._generate_response(enhanced_context)
+            # Stream the answer line by line as it is generated; each line is
+            # sanitized before it leaves the system
+            sanitizer = StreamingSanitizer()
+            parts = []
+            async for delta in self.orchestrator._generate_response_stream(
+                enhanced_context,
+                query_type=query_type,
+                role=user.role
+            ):
+                if not parts:
+                    delta = delta.lstrip()
+                    if not delta:
+                        continue
+                parts.append(delta)
+                safe_text = sanitizer.feed(delta)
+                if safe_text:
+                    yield self._format_chunk(safe_text)
+            
+            safe_text = sanitizer.flush()
+            if safe_text:
+                yield self._format_chunk(safe_text)
             
-            # Step 8: Sanitize response
-            from app.chatbot.response_guard import sanitize_response
-            sanitized_response = sanitize_response(response_text)
+            # Step 8: Sanitize the full response for validation and the audit log
+            sanitized_response = sanitize_response("".join(parts).strip())
             
             # Step 9: Validate response
             validated_response = self.orchestrator._validate_response(
@@ -164,9 +184,9 @@ Format your response to be easy to read with the following guidelines:
             # Yield error message
             yield self._format_error(str(e))
     
-    def _format_progress_update(self, message: str, step: int, total_steps: int) -> str:
+    def _format_progress_update(self, message: str, step: int, total_steps: int) -> bytes:
         """
-        Format a progress update as a JSON string.
+        Format a progress update as JSON bytes.
         
         Args:
             message: The progress message.
@@ -174,18 +194,33 @@ Format your response to be easy to read with the following guidelines:
             total_steps: The total number of steps.
             
         Returns:
-            A JSON string representing the progress update.
+            JSON bytes representing the progress update.
         """
-        return json.dumps({
+        return orjson.dumps({
             "type": "progress",
             "message": message,
             "step": step,
             "total_steps": total_steps
         })
     
-    def _format_final_response(self, response: str, query_type: str, data_accessed: List[str]) -> str:
+    def _format_chunk(self, text: str) -> bytes:
+        """
+        Format a piece of the streamed answer as JSON bytes.
+        
+        Args:
+            text: The sanitized text.
+            
+        Returns:
+            JSON bytes representing the chunk.
+        """
+        return orjson.dumps({
+            "type": "chunk",
+            "text": text
+        })
+    
+    def _format_final_response(self, response: str, query_type: str, data_accessed: List[str]) -> bytes:
         """
-        Format the final response as a JSON string.
+        Format the final response as JSON bytes.
         
         Args:
             response: The response text.
@@ -193,30 +228,30 @@ Format your response to be easy to read with the following guidelines:
             data_accessed: The data accessed.
             
         Returns:
-            A JSON string representing the final response.
+            JSON bytes representing the final response.
         """
         # Extra safety check to ensure data_accessed is a list
         if not isinstance(data_accessed, list):
             data_accessed = [str(data_accessed)] if data_accessed is not None else []
             
-        return json.dumps({
+        return orjson.dumps({
             "type": "response",
             "response": response,
             "query_type": query_type,
             "data_accessed": data_accessed
         })
     
-    def _format_error(self, error_message: str) -> str:
+    def _format_error(self, error_message: str) -> bytes:
         """
-        Format an error message as a JSON string.
+        Format an error message as JSON bytes.
         
         Args:
             error_message: The error message.
             
         Returns:
-            A JSON string representing the error.
+            JSON bytes representing the error.
         """
-        return json.dumps({
+        return orjson.dumps({
             "type": "error",
             "message": f"Error processing chat request: {error_message}"
         })
\ No newline at end of file
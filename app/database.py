@@ -1,9 +1,11 @@
 import os
 import ssl
+import orjson
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 import logging
-from sqlalchemy import inspect, text
+from sqlalchemy import JSON, inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.exc import SQLAlchemyError
 
 logger = logging.getLogger(__name__)
@@ -26,14 +28,29 @@ ssl_ctx = ssl.create_default_context()
 ssl_ctx.check_hostname = False
 ssl_ctx.verify_mode = ssl.CERT_NONE   
 
+# Prepared-statement caches so the per-patient SELECTs reuse their server-side plans.
+# Set DB_STATEMENT_CACHE_SIZE=0 behind a pgbouncer in transaction mode
+# (e.g. Neon's "-pooler" endpoint), which can't keep prepared statements.
+STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "1024"))
+PREPARED_STATEMENT_CACHE_SIZE = min(STATEMENT_CACHE_SIZE, 512)
+
 engine = create_async_engine(
     DATABASE_URL,
     echo=False,
-    connect_args={"ssl": ssl_ctx},  
+    connect_args={
+        "ssl": ssl_ctx,
+        # asyncpg's own statement cache
+        "statement_cache_size": STATEMENT_CACHE_SIZE,
+        # SQLAlchemy's asyncpg adapter cache of prepared statements
+        "prepared_statement_cache_size": PREPARED_STATEMENT_CACHE_SIZE
+    },  
     pool_pre_ping=True,          
     pool_recycle=1800,           
     pool_size=10,                
-    max_overflow=20             
+    max_overflow=20,
+    # C-level JSON (de)serialization for JSON columns
+    json_serializer=lambda value: orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode(),
+    json_deserializer=orjson.loads
 )
 
 AsyncSessionLocal = sessionmaker(
@@ -93,6 +110,42 @@ def _sync_table_sync(conn, inspector, table_name, table):
     # Add missing columns
     for column_name in missing_columns:
         _add_column_sync(conn, table_name, table.columns[column_name])
+    
+    # Convert text columns the model now declares as JSONB
+    for existing in existing_columns:
+        column = table.columns.get(existing['name'])
+        if column is not None and isinstance(column.type, JSONB) and not isinstance(existing['type'], JSON):
+            _convert_column_to_jsonb_sync(conn, table_name, column)
+    
+    # Add missing indexes (create_all only creates them for new tables)
+    existing_index_names = {idx['name'] for idx in inspector.get_indexes(table_name)}
+    for index in table.indexes:
+        if index.name not in existing_index_names:
+            _add_index_sync(conn, table_name, index)
+
+def _convert_column_to_jsonb_sync(conn, table_name, column):
+    """Convert a text column holding JSON strings to JSONB (existing values are parsed)"""
+    sql = (
+        f'ALTER TABLE "{table_name}" ALTER COLUMN "{column.name}" '
+        f'TYPE JSONB USING "{column.name}"::jsonb'
+    )
+    try:
+        logger.info(f"Converting column: {sql}")
+        # Savepoint, so a row that isn't valid JSON only fails this step
+        with conn.begin_nested():
+            conn.execute(text(sql))
+        logger.info(f"Column '{column.name}' in table '{table_name}' converted to JSONB")
+    except SQLAlchemyError as e:
+        logger.error(f"Failed to convert '{column.name}' in '{table_name}' to JSONB: {e}")
+
+def _add_index_sync(conn, table_name, index):
+    """Create an index that is declared on the model but missing in the database"""
+    try:
+        logger.info(f"Adding index '{index.name}' to table '{table_name}'")
+        index.create(conn)
+        logger.info(f"Index '{index.name}' added to table '{table_name}'")
+    except SQLAlchemyError as e:
+        logger.error(f"Failed to add index '{index.name}' to '{table_name}': {e}")
 
 def _add_column_sync(conn, table_name, column):
     """Add a column to an existing table (SAFE for existing data)"""
@@ -0,0 +1,49 @@
+"""
+Non-blocking logging for the API process.
+
+The configured handlers write to stderr/files synchronously, which blocks
+the event loop on every log call. At startup each logger's handlers are
+moved behind a QueueHandler and drained by a QueueListener thread, so a log
+call on the request path only enqueues the record.
+"""
+
+import queue
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Root plus uvicorn's loggers, which don't propagate to root
+QUEUED_LOGGERS = ("", "uvicorn", "uvicorn.error", "uvicorn.access")
+
+_listeners: List[QueueListener] = []
+
+
+def start_log_listener() -> None:
+    """Move the handlers of QUEUED_LOGGERS onto background listener threads."""
+    if _listeners:
+        return
+
+    for name in QUEUED_LOGGERS:
+        target = logging.getLogger(name)
+        handlers = [handler for handler in target.handlers if not isinstance(handler, QueueHandler)]
+        if not handlers:
+            continue
+
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        for handler in handlers:
+            target.removeHandler(handler)
+        target.addHandler(QueueHandler(log_queue))
+
+        listener.start()
+        _listeners.append(listener)
+
+    logger.info(f"Logging through {len(_listeners)} background listeners")
+
+
+def stop_log_listener() -> None:
+    """Flush queued log records and stop the listener threads."""
+    while _listeners:
+        _listeners.pop().stop()
@@ -24,6 +24,10 @@ from app.routers import patient_tasks
 from app.routers import icd_codes
 from app.chatbot.api import router as chatbot_router
 from app.chatbot.pdf_api import router as pdf_api_router
+from app.chatbot.audit import start_audit_writer, stop_audit_writer
+from app.chatbot.llm_client import close_http_client
+from app.chatbot.semcache import rag_cache
+from app.log_queue import start_log_listener, stop_log_listener
 from fastapi import WebSocket, WebSocketDisconnect, Query
 from app.web_socket import chat_manager, get_user_from_token, check_chat_access, process_websocket_message
 from app.web_socket import socket_app, sio
@@ -89,6 +93,9 @@ async def reminder_job():
 async def startup():
     print("🚀 Starting up CareIQ Patient 360 API...")
     
+    # 0. Write logs from a background thread instead of the event loop
+    start_log_listener()
+    
     # 1. Create tables if they don't exist
     print("📊 Creating database tables...")
     async with engine.begin() as conn:
@@ -121,14 +128,22 @@ async def startup():
     try:
         print("🧠 Initializing RAG pipeline for chatbot...")
         from app.chatbot.rag import rag_pipeline
-        # We'll initialize the RAG pipeline asynchronously
-        # This will be done when the first request comes in
+        from app.chatbot.api import chat_orchestrator
+        # Warm up embeddings, vector index, NER model and LLM connection
+        # so the first chat request doesn't pay the cold-start cost
+        await rag_pipeline.warmup(["hypertension", "lab results", "metformin"])
+        await chat_orchestrator.warmup()
         print("✅ RAG pipeline initialized")
     except ImportError as e:
         print(f"⚠️ Cannot import RAG pipeline: {e}")
     except Exception as e:
         print(f"⚠️ RAG pipeline initialization warning (non-critical): {e}")
     
+    # 6. Start batched audit writer for chatbot
+    print("📝 Starting chatbot audit writer...")
+    start_audit_writer(async_session)
+    print("✅ Chatbot audit writer started")
+    
     print("🎉 CareIQ Patient 360 API is ready!")
 
 # STOP SCHEDULER ON SHUTDOWN
@@ -137,6 +152,30 @@ async def shutdown_scheduler():
     scheduler.shutdown()
     print("Scheduler stopped.")
 
+# FLUSH PENDING AUDIT ROWS ON SHUTDOWN
+@app.on_event("shutdown")
+async def shutdown_audit_writer():
+    await stop_audit_writer()
+    print("Audit writer stopped.")
+
+# CLOSE SHARED OPENAI HTTP CLIENT ON SHUTDOWN
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    await close_http_client()
+    print("OpenAI HTTP client closed.")
+
+# FLUSH PENDING RAG CACHE WRITES ON SHUTDOWN
+@app.on_event("shutdown")
+async def shutdown_rag_cache():
+    rag_cache.close()
+    print("RAG cache store closed.")
+
+# FLUSH QUEUED LOG RECORDS ON SHUTDOWN
+@app.on_event("shutdown")
+async def shutdown_log_listener():
+    stop_log_listener()
+    print("Log listener stopped.")
+
 # Add the WebSocket endpoint
 @app.websocket("/api/ws/chat/{chat_id}")
 async def websocket_endpoint(
@@ -1,14 +1,14 @@
 from datetime import datetime
 from sqlalchemy import (
     Column, DateTime, String, Date, Integer, Boolean,
-    ForeignKey, Text, Numeric, Time, Table, JSON, UniqueConstraint
+    ForeignKey, Text, Numeric, Time, Table, JSON, UniqueConstraint, Index
 )
 from sqlalchemy.orm import relationship, backref
 from app.database import Base
 import uuid
 from sqlalchemy import Column, String, Integer, Float, Date, Text, DateTime
 from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 
 def generate_public_id(context):
     instance = context.current_parameters
@@ -229,6 +229,10 @@ class Allergy(Base, TimestampMixin):
 
 class PatientConsent(Base, TimestampMixin):
     __tablename__ = "patient_consents"
+    __table_args__ = (
+        # Serves the chatbot's HIPAA consent existence check
+        Index("ix_patient_consent_pid_hipaa", "patient_id", "hipaa"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
@@ -778,14 +782,18 @@ class CarePlanAudit(Base):
 
 class ChatAuditLog(Base):
    __tablename__ = "chat_audit_log"
+   __table_args__ = (
+       # Serves per-user history lookups ordered by most recent first
+       Index("ix_chat_audit_user_ts", "user_id", "timestamp"),
+   )
    
    id = Column(Integer, primary_key=True, autoincrement=True)
    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-   timestamp = Column(DateTime, default=datetime.utcnow)
+   timestamp = Column(DateTime, server_default=func.now())
    message = Column(Text, nullable=False)
    response = Column(Text, nullable=False)
    query_type = Column(String(50), nullable=False)  # data, explanation, analytics
-   data_accessed = Column(Text, nullable=True)  # JSON string of data types accessed
+   data_accessed = Column(JSONB, nullable=True)  # List of data types accessed
    context = Column(Text, nullable=True)  # JSON string of LLM context
    
    # Relationship
@@ -5,6 +5,7 @@ from pydantic import BaseModel
 from app.database import get_db
 from app.models import PatientConsents, Patient
 from app.auth import get_current_user
+from app.chatbot.consent import invalidate_consent_cache
 
 router = APIRouter(prefix="/patient-consents", tags=["Patient Consents"])
 
@@ -36,5 +37,6 @@ async def create_patient_consent(
     db.add(consent)
     await db.commit()
     await db.refresh(consent)
+    invalidate_consent_cache(consent_data.patient_id)
 
     return {"message": "Patient consents saved successfully", "consent_id": consent.id}
\ No newline at end of file